@@ -4,22 +4,21 @@ Terminal interface for MCP AI Portal Agent
 Provides command-line interface for VS Code terminal integration
 """
 
-import asyncio
+import functools
 import logging
 import sys
 import os
-from typing import Optional
+from typing import AsyncIterator, Optional, TYPE_CHECKING
 import click
-from datetime import datetime
 
-# Add the project root to the Python path
-project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
+# Running this file directly puts cli/ rather than the project root on sys.path
+if __name__ == '__main__':
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
 
-from mcp_server.browser_agent import BrowserAgent
+from mcp_server.event_loop import run_async
 from mcp_server.exceptions import BrowserConnectionError, PortalError, AuthenticationError
-from playwright.async_api import async_playwright
 
 # Configure logging
 logging.basicConfig(
@@ -31,21 +30,35 @@ logging.basicConfig(
 )
 logger = logging.getLogger("terminal_interface")
 
+if TYPE_CHECKING:
+    from mcp_server.daemon import DaemonClient
 
 class TerminalInterface:
     """Terminal interface for MCP AI Portal Agent"""
     
     def __init__(self):
-        self.browser_agent: Optional[BrowserAgent] = None
-        self.playwright_instance = None
+        self.client: Optional["DaemonClient"] = None
+    
+    async def __aenter__(self) -> "TerminalInterface":
+        if not await self.initialize():
+            # initialize() has already reported the failure
+            await self.cleanup()
+            sys.exit(1)
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.cleanup()
         
     async def initialize(self):
-        """Initialize the browser connection"""
+        """Connect to the agent daemon, starting it if it is not running"""
+        # Deferred so --help and argument errors skip the import cost
+        from mcp_server.daemon import DaemonClient
+        
         try:
             click.echo("🔄 Initializing MCP AI Portal Agent...")
-            self.playwright_instance = await async_playwright().start()
-            self.browser_agent = BrowserAgent()
-            await self.browser_agent.connect_to_browser(self.playwright_instance)
+            self.client = DaemonClient()
+            await self.client.connect()
+            await self.client.request("connect")
             click.echo("✅ Connected to Edge browser successfully")
             return True
         except BrowserConnectionError as e:
@@ -57,19 +70,16 @@ class TerminalInterface:
     
     async def cleanup(self):
         """Clean up resources"""
-        if self.browser_agent:
-            await self.browser_agent.close()
-        if self.playwright_instance:
-            await self.playwright_instance.stop()
+        if self.client:
+            await self.client.close()
     
     async def ask_ai(self, query: str) -> str:
         """Send query to AI portal and return response"""
-        if not self.browser_agent:
-            raise RuntimeError("Browser agent not initialized")
+        if not self.client:
+            raise RuntimeError("Agent daemon not connected")
         
         try:
-            click.echo(f"🤖 Sending query to AI portal...")
-            response = await self.browser_agent.ask_ai(query)
+            response = await self.client.request("ask", query=query)
             return response
         except AuthenticationError as e:
             click.echo(f"❌ Authentication error: {e}", err=True)
@@ -81,13 +91,31 @@ class TerminalInterface:
             click.echo(f"❌ Query failed: {e}", err=True)
             raise
     
+    async def ask_ai_stream(self, query: str) -> AsyncIterator[str]:
+        """Send query to AI portal and yield the response as it arrives"""
+        if not self.client:
+            raise RuntimeError("Agent daemon not connected")
+        
+        try:
+            async for chunk in self.client.stream("ask_stream", query=query):
+                yield chunk
+        except AuthenticationError as e:
+            click.echo(f"\n❌ Authentication error: {e}", err=True)
+            raise
+        except PortalError as e:
+            click.echo(f"\n❌ Portal error: {e}", err=True)
+            raise
+        except Exception as e:
+            click.echo(f"\n❌ Query failed: {e}", err=True)
+            raise
+    
     async def check_status(self) -> dict:
         """Check portal status and connection health"""
-        if not self.browser_agent:
-            raise RuntimeError("Browser agent not initialized")
+        if not self.client:
+            raise RuntimeError("Agent daemon not connected")
         
         try:
-            status = await self.browser_agent.check_portal_status()
+            status = await self.client.request("status")
             return status
         except Exception as e:
             click.echo(f"❌ Status check failed: {e}", err=True)
@@ -95,17 +123,28 @@ class TerminalInterface:
     
     async def list_models(self) -> list:
         """List available AI models"""
-        if not self.browser_agent:
-            raise RuntimeError("Browser agent not initialized")
+        if not self.client:
+            raise RuntimeError("Agent daemon not connected")
         
         try:
-            models = await self.browser_agent.list_available_models()
+            models = await self.client.request("models")
             return models
         except Exception as e:
             click.echo(f"❌ Model listing failed: {e}", err=True)
             raise
 
 
+async def echo_streamed_response(terminal: TerminalInterface, query: str):
+    """Print the AI response to the terminal as it streams in"""
+    header_shown = False
+    async for chunk in terminal.ask_ai_stream(query):
+        if not header_shown:
+            click.echo("\n📝 Response:")
+            header_shown = True
+        click.echo(chunk, nl=False)
+    click.echo()
+
+
 # CLI Commands
 @click.group()
 @click.option('--verbose', '-v', is_flag=True, help='Enable verbose logging')
@@ -119,153 +158,103 @@ def cli(ctx, verbose):
     ctx.obj['verbose'] = verbose
 
 
+def with_terminal(error_label: str = "Error"):
+    """
+    Turn an async command body into a Click callback. The body receives a
+    connected TerminalInterface followed by the command's parameters.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            async def runner():
+                try:
+                    async with TerminalInterface() as terminal:
+                        await fn(terminal, *args, **kwargs)
+                except Exception as e:
+                    click.echo(f"❌ {error_label}: {e}", err=True)
+                    sys.exit(1)
+            
+            try:
+                run_async(runner())
+            except KeyboardInterrupt:
+                click.echo("\n⏹️  Operation cancelled by user")
+                sys.exit(130)
+        return wrapper
+    return decorator
+
+
 @cli.command()
 @click.argument('query', required=True)
-@click.pass_context
-def ask(ctx, query):
+@with_terminal()
+async def ask(terminal, query):
     """Send a query to the AI portal"""
-    async def run_query():
-        terminal = TerminalInterface()
-        try:
-            if await terminal.initialize():
-                response = await terminal.ask_ai(query)
-                click.echo(f"\n📝 Response:\n{response}")
-            else:
-                sys.exit(1)
-        except KeyboardInterrupt:
-            click.echo("\n⏹️  Operation cancelled by user")
-            sys.exit(130)
-        except Exception as e:
-            click.echo(f"❌ Error: {e}", err=True)
-            sys.exit(1)
-        finally:
-            await terminal.cleanup()
-    
-    try:
-        asyncio.run(run_query())
-    except KeyboardInterrupt:
-        click.echo("\n⏹️  Operation cancelled by user")
-        sys.exit(130)
+    await echo_streamed_response(terminal, query)
 
 
 @cli.command()
-@click.pass_context
-def status(ctx):
+@with_terminal("Status check failed")
+async def status(terminal):
     """Check portal status and connection health"""
-    async def check_status():
-        terminal = TerminalInterface()
-        try:
-            if await terminal.initialize():
-                status = await terminal.check_status()
-                click.echo("\n📊 Portal Status:")
-                click.echo(f"✓ Browser connection: {status.get('browser_connected', 'Unknown')}")
-                click.echo(f"✓ Portal authentication: {status.get('authenticated', 'Unknown')}")
-                click.echo(f"✓ Available models: {', '.join(status.get('available_models', []))}")
-                click.echo(f"✓ Session status: {status.get('session_status', 'Unknown')}")
-            else:
-                sys.exit(1)
-        except Exception as e:
-            click.echo(f"❌ Status check failed: {e}", err=True)
-            sys.exit(1)
-        finally:
-            await terminal.cleanup()
-    
-    try:
-        asyncio.run(check_status())
-    except KeyboardInterrupt:
-        click.echo("\n⏹️  Operation cancelled by user")
-        sys.exit(130)
+    status = await terminal.check_status()
+    click.echo("\n📊 Portal Status:")
+    click.echo(f"✓ Browser connection: {status.get('browser_connected', 'Unknown')}")
+    click.echo(f"✓ Portal authentication: {status.get('authenticated', 'Unknown')}")
+    click.echo(f"✓ Available models: {', '.join(status.get('available_models', []))}")
+    click.echo(f"✓ Session status: {status.get('session_status', 'Unknown')}")
 
 
 @cli.command()
-@click.pass_context
-def models(ctx):
+@with_terminal("Model listing failed")
+async def models(terminal):
     """List available AI models"""
-    async def list_models():
-        terminal = TerminalInterface()
-        try:
-            if await terminal.initialize():
-                models = await terminal.list_models()
-                click.echo("\n🤖 Available AI Models:")
-                for model in models:
-                    click.echo(f"  • {model}")
-            else:
-                sys.exit(1)
-        except Exception as e:
-            click.echo(f"❌ Model listing failed: {e}", err=True)
-            sys.exit(1)
-        finally:
-            await terminal.cleanup()
-    
-    try:
-        asyncio.run(list_models())
-    except KeyboardInterrupt:
-        click.echo("\n⏹️  Operation cancelled by user")
-        sys.exit(130)
+    models = await terminal.list_models()
+    click.echo("\n🤖 Available AI Models:")
+    for model in models:
+        click.echo(f"  • {model}")
 
 
 @cli.command()
-@click.pass_context
-def interactive(ctx):
+@with_terminal()
+async def interactive(terminal):
     """Start interactive mode for continuous queries"""
-    async def run_interactive():
-        terminal = TerminalInterface()
+    click.echo("\n🚀 Interactive Mode - MCP AI Portal Agent")
+    click.echo("Type 'quit' or 'exit' to end session, 'help' for commands")
+    click.echo("-" * 50)
+    
+    while True:
         try:
-            if not await terminal.initialize():
-                sys.exit(1)
+            query = click.prompt("\n💬 Ask AI", type=str)
             
-            click.echo("\n🚀 Interactive Mode - MCP AI Portal Agent")
-            click.echo("Type 'quit' or 'exit' to end session, 'help' for commands")
-            click.echo("-" * 50)
+            if query.lower() in ['quit', 'exit']:
+                click.echo("👋 Goodbye!")
+                break
+            elif query.lower() == 'help':
+                click.echo("\nAvailable commands:")
+                click.echo("  • Type any question to ask the AI")
+                click.echo("  • 'status' - Check portal status")
+                click.echo("  • 'models' - List available models")
+                click.echo("  • 'quit' or 'exit' - End session")
+                continue
+            elif query.lower() == 'status':
+                status = await terminal.check_status()
+                click.echo(f"\n📊 Status: {status}")
+                continue
+            elif query.lower() == 'models':
+                models = await terminal.list_models()
+                click.echo(f"\n🤖 Models: {', '.join(models)}")
+                continue
             
-            while True:
-                try:
-                    query = click.prompt("\n💬 Ask AI", type=str)
-                    
-                    if query.lower() in ['quit', 'exit']:
-                        click.echo("👋 Goodbye!")
-                        break
-                    elif query.lower() == 'help':
-                        click.echo("\nAvailable commands:")
-                        click.echo("  • Type any question to ask the AI")
-                        click.echo("  • 'status' - Check portal status")
-                        click.echo("  • 'models' - List available models")
-                        click.echo("  • 'quit' or 'exit' - End session")
-                        continue
-                    elif query.lower() == 'status':
-                        status = await terminal.check_status()
-                        click.echo(f"\n📊 Status: {status}")
-                        continue
-                    elif query.lower() == 'models':
-                        models = await terminal.list_models()
-                        click.echo(f"\n🤖 Models: {', '.join(models)}")
-                        continue
-                    
-                    if query.strip():
-                        response = await terminal.ask_ai(query)
-                        click.echo(f"\n📝 Response:\n{response}")
-                    
-                except KeyboardInterrupt:
-                    click.echo("\n⏹️  Use 'quit' or 'exit' to end session")
-                    continue
-                except EOFError:
-                    click.echo("\n👋 Goodbye!")
-                    break
-                except Exception as e:
-                    click.echo(f"❌ Error: {e}", err=True)
-                    continue
-        
-        except KeyboardInterrupt:
-            click.echo("\n⏹️  Session ended by user")
-        finally:
-            await terminal.cleanup()
-    
-    try:
-        asyncio.run(run_interactive())
-    except KeyboardInterrupt:
-        click.echo("\n👋 Goodbye!")
-        sys.exit(130)
+            if query.strip():
+                await echo_streamed_response(terminal, query)
+            
+        except click.Abort:
+            # click.prompt raises Abort on Ctrl+C and Ctrl+D
+            click.echo("\n👋 Goodbye!")
+            break
+        except Exception as e:
+            click.echo(f"❌ Error: {e}", err=True)
+            continue
 
 
 if __name__ == '__main__':
-    cli()
\ No newline at end of file
+    cli()
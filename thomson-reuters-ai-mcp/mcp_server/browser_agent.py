@@ -1,106 +1,259 @@
 import asyncio
 import logging
+import random
 import time
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple, Union
 from playwright.async_api import Browser, Page, expect, async_playwright
-from src.portal.portal_interface import PortalInterface
-from .exceptions import BrowserConnectionError, PortalError, AuthenticationError, TimeoutError
+from src.portal.portal_interface import REVISED_PREFIX, PortalInterface
+from .exceptions import BrowserConnectionError, PortalError
 from .config import get_config
+from .portal_session import PORTAL_URL_PART, get_or_open_portal
 
 logger = logging.getLogger(__name__)
 
+CHAT_INPUT_SELECTOR = 'textarea[placeholder*="Type your message"]'
+
+# URL fragments that mean the tab was redirected to a sign-in page, matched
+# against the lowercased URL since SSO redirects such as /SignIn vary in case
+LOGIN_URL_MARKERS = ("login", "signin")
+
+
+def _preview(text: str, limit: int = 100) -> str:
+    """Shorten text for log lines, marking when it was cut"""
+    return text if len(text) <= limit else f"{text[:limit]}..."
+
 class BrowserAgent:
     def __init__(self):
         self.browser: Browser = None
         self.page: Page = None
         self.portal_interface: PortalInterface = None
-        self.playwright_instance = None
+        self.playwright_instance = None  # Only set when the agent owns Playwright (async with)
+        self._playwright = None  # Instance the connection was made with, reused to reconnect
+        self._disconnected = False
         self.config = get_config()
         self.connection_health_check_interval = 30  # seconds
-        self.last_health_check = 0
+        self.last_health_check = 0  # Wall-clock time, reported in status
+        self._last_healthy = float("-inf")  # Monotonic time of the last successful page call
+        # Each portal tab holds one prompt/response exchange at a time, so
+        # queries check a tab out of the pool for their whole exchange
+        self._page_pool: Optional[asyncio.Queue] = None
+        self._pool_pages: List[Page] = []  # Tabs opened by the agent for the pool
+        self._pool_members: List[PortalInterface] = []  # Interfaces belonging to the current pool
+        self._models_cache: Optional[Tuple[float, List[str]]] = None  # (fetched at, models)
+        self._models_ttl = 60.0  # seconds
+        self._models_task: Optional[asyncio.Task] = None
+        self._user_agent: Optional[str] = None  # Constant for the browser session
+        self._title_cache: Optional[Tuple[float, str]] = None  # (fetched at, page title)
+        self._session_ttl = 5.0  # seconds
+
+    async def __aenter__(self) -> "BrowserAgent":
+        """Start an owned Playwright instance and connect to the browser"""
+        self.playwright_instance = await async_playwright().start()
+        try:
+            await self.connect_to_browser(self.playwright_instance)
+        except BaseException:
+            await self.close()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
 
     async def connect_to_browser(self, playwright_instance, max_retries: int = 3):
         """Connect to existing Edge browser with retry logic"""
-        logger.info("Connecting to existing Edge browser session...")
+        logger.debug("Connecting to existing Edge browser session...")
         
         for attempt in range(max_retries):
             try:
                 # Connect to an existing Edge browser instance via CDP
-                endpoint_url = f"http://localhost:{self.config.browser.debug_port}"
-                logger.info(f"Attempting to connect to browser at {endpoint_url} (attempt {attempt + 1})")
-                
-                self.browser = await playwright_instance.chromium.connect_over_cdp(
-                    endpoint_url,
-                    timeout=self.config.browser.timeout
-                )
-                
-                # Get the first page or create new one
-                if self.browser.contexts and self.browser.contexts[0].pages:
-                    self.page = self.browser.contexts[0].pages[0]
-                else:
-                    context = await self.browser.new_context()
-                    self.page = await context.new_page()
-                
-                self.portal_interface = PortalInterface(self.page)
-                logger.info(f"Connected to browser. Current URL: {self.page.url}")
+                logger.debug(f"Attempting to connect to browser on port {self.config.browser.debug_port} (attempt {attempt + 1})")
+                browser, self.page = await get_or_open_portal(playwright_instance, self.config)
+                if browser is not self.browser:
+                    # A reconnect may hand back the same live connection, already watched
+                    browser.on("disconnected", self._on_disconnected)
+                    self.browser = browser
+                self._playwright = playwright_instance
+                self._disconnected = False
+                logger.debug(f"Connected to browser. Current URL: {self.page.url}")
                 
-                # Navigate to the AI portal if not already there
-                portal_url = self.config.get_portal_url()
-                expected_url_part = "dataandanalytics.int.thomsonreuters.com/ai-platform"
+                self.portal_interface = await self._open_portal(self.page)
+                await self._warm_up_pool(self.config.browser.page_pool_size)
                 
-                if expected_url_part not in self.page.url:
-                    logger.info(f"Navigating to AI portal: {portal_url}")
-                    await self.page.goto(portal_url, timeout=self.config.browser.timeout)
-                    await self.page.wait_for_load_state("networkidle")
-                    logger.info(f"Navigated to {self.page.url}")
-                
-                # Update health check timestamp
-                self.last_health_check = time.time()
-                logger.info("Browser connection established successfully")
+                self._mark_healthy()
+                if not self._models_task:
+                    self._models_task = asyncio.create_task(self._refresh_models_loop())
+                logger.info(f"Browser connection established: {self.page.url}")
                 return
                 
+            except BrowserConnectionError:
+                # The debug port never opened; the port probe has already waited
+                # for a starting browser, so another attempt would only repeat that
+                raise
             except Exception as e:
                 logger.warning(f"Connection attempt {attempt + 1} failed: {e}")
                 if attempt < max_retries - 1:
-                    wait_time = (2 ** attempt) * self.config.portal.retry_delay
-                    logger.info(f"Retrying in {wait_time} seconds...")
+                    # The port is up but the handshake failed, which is usually
+                    # transient. Jitter keeps agents started together from retrying in lockstep.
+                    wait_time = self.config.portal.retry_delay + random.uniform(0, 0.25)
+                    logger.info(f"Retrying in {wait_time:.2f} seconds...")
                     await asyncio.sleep(wait_time)
                 else:
                     logger.error(f"Failed to connect to browser after {max_retries} attempts")
                     raise BrowserConnectionError(f"Failed to connect to browser: {e}")
 
-    async def ask_ai(self, query: str) -> str:
-        """Send query to AI portal and return response"""
-        if not self.page:
-            raise RuntimeError("Browser not connected. Call connect_to_browser first.")
+    async def _open_portal(self, page: Page) -> PortalInterface:
+        """Make sure the tab shows an interactive AI portal and wrap it in a PortalInterface"""
+        portal_interface = PortalInterface(page)
+        await portal_interface.enable_streaming()
         
-        # Validate input
-        if not query or not query.strip():
-            raise ValueError("Query cannot be empty")
+        # Navigate to the AI portal unless it is already open and interactive;
+        # both paths treat a visible chat input as "interactive"
+        chat_input = page.locator(CHAT_INPUT_SELECTOR).first
+        if PORTAL_URL_PART in page.url and await chat_input.is_visible():
+            logger.debug("AI portal already loaded, skipping navigation")
+            return portal_interface
         
-        if len(query) > self.config.security.max_query_length:
-            raise ValueError(f"Query too long. Maximum length: {self.config.security.max_query_length}")
+        portal_url = self.config.get_portal_url()
+        logger.info(f"Navigating to AI portal: {portal_url}")
+        await page.goto(portal_url, wait_until="domcontentloaded", timeout=self.config.browser.timeout)
+        # Wait for the element we need rather than global network quiescence
+        try:
+            await expect(chat_input).to_be_visible(timeout=self.config.browser.timeout)
+            logger.debug(f"Navigated to {page.url}")
+        except AssertionError:
+            # Typically an SSO or login redirect; the connection itself is fine and
+            # _check_authentication reports the login state
+            logger.warning(f"Chat input not visible after navigating, now at {page.url}")
         
-        # Check connection health
-        await self._check_connection_health()
+        return portal_interface
+
+    async def _warm_up_pool(self, size: int):
+        """Fill the page pool with the main tab plus size - 1 extra portal tabs"""
+        await self._close_pool_pages()
+        self._page_pool = asyncio.Queue()
+        self._page_pool.put_nowait(self.portal_interface)
+        self._pool_members = [self.portal_interface]
         
-        logger.info(f"Asking AI: {query[:100]}..." if len(query) > 100 else f"Asking AI: {query}")
+        if size <= 1:
+            return
         
+        logger.debug(f"Opening {size - 1} extra portal tabs")
+        for _ in range(size - 1):
+            self._pool_pages.append(await self.page.context.new_page())
+        # Navigations are independent, so load the tabs concurrently
+        for portal_interface in await asyncio.gather(*(self._open_portal(page) for page in self._pool_pages)):
+            self._page_pool.put_nowait(portal_interface)
+            self._pool_members.append(portal_interface)
+
+    async def acquire(self) -> PortalInterface:
+        """Check a portal tab out of the pool, waiting until one is free"""
+        if not self._page_pool:
+            raise RuntimeError("Browser not connected. Call connect_to_browser first.")
+        return await self._page_pool.get()
+
+    def release(self, portal_interface: PortalInterface):
+        """Return a portal tab to the pool, dropping tabs from before a reconnect"""
+        if self._page_pool and portal_interface in self._pool_members:
+            self._page_pool.put_nowait(portal_interface)
+
+    async def _close_pool_pages(self):
+        """Close the extra tabs opened for the pool; the main tab belongs to the user"""
+        pages, self._pool_pages = self._pool_pages, []
+        results = await asyncio.gather(*(page.close() for page in pages), return_exceptions=True)
+        for error in results:
+            if isinstance(error, Exception):
+                logger.debug(f"Error closing pooled tab: {error}")
+
+    async def ask_ai(self, query: str) -> str:
+        """Send query to AI portal and return response"""
+        await self._prepare_query(query)
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Asking AI: {_preview(query)}")
+        
+        portal_interface = await self.acquire()
         try:
-            await self.portal_interface.send_message(query)
-            response_text = await self.portal_interface.wait_for_response(timeout=self.config.portal.response_timeout)
+            # Counted before sending so a fast reply is not mistaken for an old one
+            baseline = await portal_interface.response_count()
+            await portal_interface.send_message(query)
+            response_text = await portal_interface.wait_for_response(
+                timeout=self.config.portal.response_timeout, baseline=baseline
+            )
             
             # Validate response length
-            if len(response_text) > self.config.security.max_response_length:
+            max_length = self.config.security.max_response_length
+            if len(response_text) > max_length:
                 logger.warning(f"Response truncated. Original length: {len(response_text)}")
-                response_text = response_text[:self.config.security.max_response_length] + "...[truncated]"
+                response_text = f"{response_text[:max_length]}...[truncated]"
             
-            logger.info(f"Received AI response: {response_text[:100]}..." if len(response_text) > 100 else f"Received AI response: {response_text}")
+            self._mark_healthy()
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"Received AI response: {_preview(response_text)}")
             return response_text
             
         except Exception as e:
             logger.error(f"Error during AI interaction: {e}")
             raise PortalError(f"Failed to get AI response: {e}")
+        finally:
+            self.release(portal_interface)
+
+    async def ask_ai_stream(self, query: str) -> AsyncIterator[str]:
+        """Send query to AI portal and yield the response text as it arrives"""
+        await self._prepare_query(query)
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Streaming AI response for: {_preview(query)}")
+        
+        max_length = self.config.security.max_response_length
+        received = 0
+        portal_interface = await self.acquire()
+        try:
+            async for chunk in portal_interface.stream_response(query, timeout=self.config.portal.response_timeout):
+                prefix = ""
+                if chunk.startswith(REVISED_PREFIX):
+                    # The full final response follows and replaces what was sent
+                    prefix, chunk, received = REVISED_PREFIX, chunk[len(REVISED_PREFIX):], 0
+                if received + len(chunk) > max_length:
+                    logger.warning(f"Streamed response truncated at {max_length} characters")
+                    yield prefix + chunk[:max_length - received] + "...[truncated]"
+                    return
+                received += len(chunk)
+                yield prefix + chunk
+            self._mark_healthy()
+                
+        except Exception as e:
+            logger.error(f"Error during AI interaction: {e}")
+            raise PortalError(f"Failed to get AI response: {e}")
+        finally:
+            self.release(portal_interface)
+
+    async def ask_ai_many(self, queries: List[str], concurrency: int = 4) -> List[Union[str, BaseException]]:
+        """
+        Ask several queries concurrently, at most `concurrency` at a time.
+        Results are in query order; a failed query yields its exception.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def ask_one(query: str) -> str:
+            async with semaphore:
+                return await self.ask_ai(query)
+        
+        return await asyncio.gather(*(ask_one(query) for query in queries), return_exceptions=True)
+
+    async def _prepare_query(self, query: str):
+        """Validate a query and make sure the connection is usable before sending it"""
+        if not self.page:
+            raise RuntimeError("Browser not connected. Call connect_to_browser first.")
+        
+        # Validate input
+        if not query or not query.strip():
+            raise ValueError("Query cannot be empty")
+        
+        if len(query) > self.config.security.max_query_length:
+            raise ValueError(f"Query too long. Maximum length: {self.config.security.max_query_length}")
+        
+        # Check connection health
+        await self._check_connection_health()
 
     async def check_portal_status(self) -> Dict[str, Any]:
         """Check portal status and connection health"""
@@ -113,14 +266,15 @@ class BrowserAgent:
             }
         
         try:
-            # Check browser connection
+            # The health check may reconnect and replace the page, so it runs first;
+            # a failure propagates to the error status below
             await self._check_connection_health()
-            
-            # Check authentication status
-            authenticated = await self._check_authentication()
-            
-            # Get available models
-            available_models = await self.list_available_models()
+            # The remaining probes only read the refreshed page, so run them concurrently
+            authenticated, available_models = await asyncio.gather(
+                self._check_authentication(),
+                self.list_available_models()
+            )
+            self._mark_healthy()
             
             return {
                 "browser_connected": True,
@@ -146,26 +300,58 @@ class BrowserAgent:
         if not self.page:
             return []
         
+        # Normally kept fresh by the background refresh started on connect
+        if self._models_cache and time.monotonic() - self._models_cache[0] < self._models_ttl:
+            return list(self._models_cache[1])
+        
         try:
-            # This is a placeholder - actual implementation depends on portal UI
-            # For now, return known models
-            return ["Claude Sonnet 4", "GPT-4", "Claude Haiku"]
+            models = await self._fetch_models()
+            self._models_cache = (time.monotonic(), models)
+            return list(models)
             
         except Exception as e:
             logger.error(f"Error listing available models: {e}")
             return []
     
+    async def _fetch_models(self) -> List[str]:
+        """Read the model list from the portal"""
+        # This is a placeholder - actual implementation depends on portal UI
+        # For now, return known models
+        return ["Claude Sonnet 4", "GPT-4", "Claude Haiku"]
+    
+    async def _refresh_models_loop(self):
+        """Refresh the model cache in the background, well inside its TTL"""
+        while True:
+            try:
+                self._models_cache = (time.monotonic(), await self._fetch_models())
+            except Exception as e:
+                logger.debug(f"Background model refresh failed: {e}")
+            await asyncio.sleep(self._models_ttl / 2)
+    
     async def get_portal_session(self) -> Dict[str, Any]:
         """Get current portal session information"""
         if not self.page:
             return {}
         
         try:
+            # MCP clients poll this; the title is only re-read once the TTL expires
+            if self._title_cache and time.monotonic() - self._title_cache[0] < self._session_ttl:
+                page_title = self._title_cache[1]
+            else:
+                if self._user_agent is None:
+                    self._user_agent, page_title = await asyncio.gather(
+                        self.page.evaluate("navigator.userAgent"),
+                        self.page.title()
+                    )
+                else:
+                    page_title = await self.page.title()
+                self._title_cache = (time.monotonic(), page_title)
+                self._mark_healthy()
             return {
                 "session_id": "unknown",  # Portal-specific implementation needed
-                "user_agent": await self.page.evaluate("navigator.userAgent"),
+                "user_agent": self._user_agent,
                 "current_url": self.page.url,
-                "page_title": await self.page.title(),
+                "page_title": page_title,
                 "connected_at": self.last_health_check
             }
             
@@ -174,19 +360,47 @@ class BrowserAgent:
             return {"error": str(e)}
     
     async def _check_connection_health(self):
-        """Check and maintain connection health"""
-        current_time = time.time()
-        
-        if current_time - self.last_health_check > self.connection_health_check_interval:
+        """Probe the connection unless another page call succeeded within the interval"""
+        if not self._disconnected:
+            if time.monotonic() - self._last_healthy <= self.connection_health_check_interval:
+                return
+            
             try:
                 # Simple health check - get page title
                 await self.page.title()
-                self.last_health_check = current_time
+                self._mark_healthy()
                 logger.debug("Connection health check passed")
+                return
                 
             except Exception as e:
-                logger.error(f"Connection health check failed: {e}")
-                raise BrowserConnectionError(f"Connection health check failed: {e}")
+                logger.warning(f"Connection health check failed: {e}")
+        
+        await self._reconnect()
+    
+    async def _reconnect(self):
+        """
+        Re-attach over CDP after the connection dropped. The portal tab is
+        still open in Edge, so it is found again without navigating.
+        """
+        if not self._playwright:
+            raise BrowserConnectionError("Browser connection lost")
+        
+        logger.info("Browser connection lost, reconnecting...")
+        try:
+            await self.connect_to_browser(self._playwright, max_retries=1)
+        except Exception as e:
+            logger.error(f"Reconnect failed: {e}")
+            raise BrowserConnectionError(f"Connection health check failed: {e}")
+    
+    def _on_disconnected(self, browser: Browser):
+        """Flag a dropped CDP connection so the next query reconnects up front"""
+        if browser is self.browser:
+            self._disconnected = True
+    
+    def _mark_healthy(self):
+        """Record a successful page call; it proves the connection as well as a probe would"""
+        self._last_healthy = time.monotonic()
+        self.last_health_check = time.time()
     
     async def _check_authentication(self) -> bool:
         """Check if user is authenticated"""
@@ -195,7 +409,8 @@ class BrowserAgent:
             # This is portal-specific and may need adjustment
             
             # Check if we're on a login page
-            if "login" in self.page.url.lower():
+            url = self.page.url.lower()
+            if any(marker in url for marker in LOGIN_URL_MARKERS):
                 return False
             
             # Check for common authentication elements
@@ -207,27 +422,44 @@ class BrowserAgent:
             return False
     
     async def close(self):
-        """Clean up resources"""
+        """Clean up resources; repeated or concurrent calls are no-ops"""
+        # Detach everything before the first await so a second close() finds nothing to do
+        browser, self.browser = self.browser, None
+        playwright_instance, self.playwright_instance = self.playwright_instance, None
+        models_task, self._models_task = self._models_task, None
+        self.page = None
+        self.portal_interface = None
+        self._page_pool = None
+        self._pool_members = []
+        self._playwright = None
+        self._models_cache = None
+        self._user_agent = None
+        self._title_cache = None
+        
+        if models_task:
+            models_task.cancel()
+        
         try:
-            if self.browser:
-                await self.browser.close()
+            await self._close_pool_pages()
+            if browser:
+                await browser.close()
                 logger.info("Browser closed.")
-            if self.playwright_instance:
-                await self.playwright_instance.stop()
-                logger.info("Playwright stopped.")
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
+        finally:
+            # Stopped last: closing the browser goes through the Playwright driver
+            if playwright_instance:
+                try:
+                    await playwright_instance.stop()
+                    logger.info("Playwright stopped.")
+                except Exception as e:
+                    logger.error(f"Error stopping Playwright: {e}")
 
 async def main():
     """Test the browser agent"""
-    async with async_playwright() as playwright:
-        agent = BrowserAgent()
-        try:
-            await agent.connect_to_browser(playwright)
-            response = await agent.ask_ai("What is the capital of France?")
-            print(f"Final AI Response: {response}")
-        finally:
-            await agent.close()
+    async with BrowserAgent() as agent:
+        response = await agent.ask_ai("What is the capital of France?")
+        print(f"Final AI Response: {response}")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -4,15 +4,24 @@ Handles environment variables and configuration settings
 """
 
 import os
+import sys
 import logging
-from typing import Optional, Dict, Any
-from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Optional, Any, FrozenSet, Mapping
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 
+from .exceptions import ConfigurationError
+
 logger = logging.getLogger(__name__)
 
+# Slotted dataclasses drop the per-instance __dict__; slots= needs Python 3.10
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+_VALID_URL_SCHEMES = ('http://', 'https://')
+
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class BrowserConfig:
     """Browser configuration settings"""
     debug_port: int = 9222
@@ -20,9 +29,10 @@ class BrowserConfig:
     timeout: int = 30000
     headless: bool = False
     slow_mo: int = 0
+    page_pool_size: int = 1  # Portal tabs kept open for concurrent queries
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class PortalConfig:
     """Portal configuration settings"""
     base_url: str = "https://dataandanalytics.int.thomsonreuters.com"
@@ -32,7 +42,7 @@ class PortalConfig:
     retry_delay: int = 1
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class MCPConfig:
     """MCP server configuration settings"""
     server_name: str = "thomson-reuters-ai-mcp"
@@ -41,25 +51,103 @@ class MCPConfig:
     max_concurrent_requests: int = 1
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
+class DaemonConfig:
+    """CLI daemon configuration settings"""
+    socket_path: str = "/tmp/mcp-agent.sock"
+    port: int = 9333  # Used instead of the socket where Unix sockets are unavailable
+    startup_timeout: int = 30
+    idle_timeout: int = 1800  # Seconds without clients before the daemon exits; 0 keeps it running
+    log_file: str = str(Path.home() / ".cache" / "mcp-agent" / "daemon.log")
+    token_file: str = str(Path.home() / ".cache" / "mcp-agent" / "daemon.token")  # TCP fallback only
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class SecurityConfig:
     """Security configuration settings"""
     enable_input_validation: bool = True
     sanitize_responses: bool = True
     max_query_length: int = 10000
     max_response_length: int = 50000
-    allowed_domains: list = None
+    allowed_domains: FrozenSet[str] = field(default_factory=frozenset)  # Immutable for O(1) lookups
+
+
+def _env_bool(value: str) -> bool:
+    """Parse a 'true'/'false' environment value"""
+    return value.lower() == 'true'
 
 
 class Config:
     """Main configuration class"""
     
+    # (section, attribute, environment variable, converter)
+    _ENV_SPEC = (
+        # Browser configuration
+        ('browser', 'debug_port', 'MCP_BROWSER_DEBUG_PORT', int),
+        ('browser', 'user_data_dir', 'MCP_BROWSER_USER_DATA_DIR', str),
+        ('browser', 'timeout', 'MCP_BROWSER_TIMEOUT', int),
+        ('browser', 'headless', 'MCP_BROWSER_HEADLESS', _env_bool),
+        ('browser', 'slow_mo', 'MCP_BROWSER_SLOW_MO', int),
+        ('browser', 'page_pool_size', 'MCP_BROWSER_PAGE_POOL_SIZE', int),
+        
+        # Portal configuration
+        ('portal', 'base_url', 'MCP_PORTAL_BASE_URL', str),
+        ('portal', 'ai_platform_path', 'MCP_PORTAL_AI_PATH', str),
+        ('portal', 'response_timeout', 'MCP_PORTAL_RESPONSE_TIMEOUT', int),
+        ('portal', 'retry_attempts', 'MCP_PORTAL_RETRY_ATTEMPTS', int),
+        ('portal', 'retry_delay', 'MCP_PORTAL_RETRY_DELAY', int),
+        
+        # MCP configuration
+        ('mcp', 'server_name', 'MCP_SERVER_NAME', str),
+        ('mcp', 'server_version', 'MCP_SERVER_VERSION', str),
+        ('mcp', 'log_level', 'MCP_LOG_LEVEL', str),
+        ('mcp', 'max_concurrent_requests', 'MCP_MAX_CONCURRENT_REQUESTS', int),
+        
+        # Daemon configuration
+        ('daemon', 'socket_path', 'MCP_DAEMON_SOCKET', str),
+        ('daemon', 'port', 'MCP_DAEMON_PORT', int),
+        ('daemon', 'startup_timeout', 'MCP_DAEMON_STARTUP_TIMEOUT', int),
+        ('daemon', 'idle_timeout', 'MCP_DAEMON_IDLE_TIMEOUT', int),
+        ('daemon', 'log_file', 'MCP_DAEMON_LOG_FILE', str),
+        ('daemon', 'token_file', 'MCP_DAEMON_TOKEN_FILE', str),
+        
+        # Security configuration
+        ('security', 'enable_input_validation', 'MCP_ENABLE_INPUT_VALIDATION', _env_bool),
+        ('security', 'sanitize_responses', 'MCP_SANITIZE_RESPONSES', _env_bool),
+        ('security', 'max_query_length', 'MCP_MAX_QUERY_LENGTH', int),
+        ('security', 'max_response_length', 'MCP_MAX_RESPONSE_LENGTH', int),
+    )
+    
+    # (section, attribute, check, description). Loaded values already have
+    # their converted types, so only ranges and formats are checked.
+    _VALIDATORS = (
+        # Browser configuration
+        ('browser', 'debug_port', lambda v: v >= 1024, 'browser debug port'),
+        ('browser', 'timeout', lambda v: v >= 1000, 'browser timeout'),
+        ('browser', 'page_pool_size', lambda v: v >= 1, 'browser page pool size'),
+        
+        # Portal configuration
+        ('portal', 'base_url', lambda v: v.startswith(_VALID_URL_SCHEMES), 'portal base URL'),
+        ('portal', 'response_timeout', lambda v: v >= 1, 'portal response timeout'),
+        
+        # Daemon configuration
+        ('daemon', 'port', lambda v: 1024 <= v <= 65535, 'daemon port'),
+        ('daemon', 'startup_timeout', lambda v: v >= 1, 'daemon startup timeout'),
+        ('daemon', 'idle_timeout', lambda v: v >= 0, 'daemon idle timeout'),
+        
+        # Security configuration
+        ('security', 'max_query_length', lambda v: v >= 1, 'max query length'),
+        ('security', 'max_response_length', lambda v: v >= 1, 'max response length'),
+    )
+    
     def __init__(self, config_file: Optional[str] = None):
         self.config_file = config_file
         self.browser = BrowserConfig()
         self.portal = PortalConfig()
         self.mcp = MCPConfig()
+        self.daemon = DaemonConfig()
         self.security = SecurityConfig()
+        self._dict_cache: Optional[Mapping[str, Mapping[str, Any]]] = None
         self._load_config()
     
     def _load_config(self):
@@ -73,44 +161,33 @@ class Config:
         
         # Validate configuration
         self._validate_config()
+        
+        # Derived values are fixed once loaded, so build them here rather than per call
+        self._portal_url = f"{self.portal.base_url.rstrip('/')}{self.portal.ai_platform_path}"
+        self._browser_args = MappingProxyType({
+            'endpoint_url': f'http://localhost:{self.browser.debug_port}',
+            'slow_mo': self.browser.slow_mo,
+            'timeout': self.browser.timeout
+        })
     
     def _load_from_env(self):
         """Load configuration from environment variables"""
-        # Browser configuration
-        self.browser.debug_port = int(os.getenv('MCP_BROWSER_DEBUG_PORT', self.browser.debug_port))
-        # Only set user_data_dir if explicitly provided to preserve default profile
-        user_data_dir_env = os.getenv('MCP_BROWSER_USER_DATA_DIR')
-        if user_data_dir_env:
-            self.browser.user_data_dir = user_data_dir_env
-        self.browser.timeout = int(os.getenv('MCP_BROWSER_TIMEOUT', self.browser.timeout))
-        self.browser.headless = os.getenv('MCP_BROWSER_HEADLESS', 'false').lower() == 'true'
-        self.browser.slow_mo = int(os.getenv('MCP_BROWSER_SLOW_MO', self.browser.slow_mo))
-        
-        # Portal configuration
-        self.portal.base_url = os.getenv('MCP_PORTAL_BASE_URL', self.portal.base_url)
-        self.portal.ai_platform_path = os.getenv('MCP_PORTAL_AI_PATH', self.portal.ai_platform_path)
-        self.portal.response_timeout = int(os.getenv('MCP_PORTAL_RESPONSE_TIMEOUT', self.portal.response_timeout))
-        self.portal.retry_attempts = int(os.getenv('MCP_PORTAL_RETRY_ATTEMPTS', self.portal.retry_attempts))
-        self.portal.retry_delay = int(os.getenv('MCP_PORTAL_RETRY_DELAY', self.portal.retry_delay))
-        
-        # MCP configuration
-        self.mcp.server_name = os.getenv('MCP_SERVER_NAME', self.mcp.server_name)
-        self.mcp.server_version = os.getenv('MCP_SERVER_VERSION', self.mcp.server_version)
-        self.mcp.log_level = os.getenv('MCP_LOG_LEVEL', self.mcp.log_level)
-        self.mcp.max_concurrent_requests = int(os.getenv('MCP_MAX_CONCURRENT_REQUESTS', self.mcp.max_concurrent_requests))
-        
-        # Security configuration
-        self.security.enable_input_validation = os.getenv('MCP_ENABLE_INPUT_VALIDATION', 'true').lower() == 'true'
-        self.security.sanitize_responses = os.getenv('MCP_SANITIZE_RESPONSES', 'true').lower() == 'true'
-        self.security.max_query_length = int(os.getenv('MCP_MAX_QUERY_LENGTH', self.security.max_query_length))
-        self.security.max_response_length = int(os.getenv('MCP_MAX_RESPONSE_LENGTH', self.security.max_response_length))
+        env = os.environ
+        for section, attr, key, convert in self._ENV_SPEC:
+            value = env.get(key)
+            # Empty values keep the default, e.g. an empty user_data_dir
+            # preserves the default profile with login data
+            if value:
+                setattr(getattr(self, section), attr, convert(value))
         
         # Parse allowed domains
-        allowed_domains_str = os.getenv('MCP_ALLOWED_DOMAINS', '')
+        allowed_domains_str = env.get('MCP_ALLOWED_DOMAINS', '')
         if allowed_domains_str:
-            self.security.allowed_domains = [domain.strip() for domain in allowed_domains_str.split(',')]
+            self.security.allowed_domains = frozenset(
+                domain.strip() for domain in allowed_domains_str.split(',') if domain.strip()
+            )
         else:
-            self.security.allowed_domains = ['dataandanalytics.int.thomsonreuters.com']
+            self.security.allowed_domains = frozenset({'dataandanalytics.int.thomsonreuters.com'})
     
     def _load_from_file(self):
         """Load configuration from file (JSON or YAML)"""
@@ -120,80 +197,53 @@ class Config:
     
     def _validate_config(self):
         """Validate configuration values"""
-        # Validate browser configuration
-        if not isinstance(self.browser.debug_port, int) or self.browser.debug_port < 1024:
-            raise ValueError(f"Invalid browser debug port: {self.browser.debug_port}")
-        
-        if not isinstance(self.browser.timeout, int) or self.browser.timeout < 1000:
-            raise ValueError(f"Invalid browser timeout: {self.browser.timeout}")
-        
-        # Validate portal configuration
-        if not self.portal.base_url.startswith(('http://', 'https://')):
-            raise ValueError(f"Invalid portal base URL: {self.portal.base_url}")
-        
-        if not isinstance(self.portal.response_timeout, int) or self.portal.response_timeout < 1:
-            raise ValueError(f"Invalid portal response timeout: {self.portal.response_timeout}")
-        
-        # Validate security configuration
-        if not isinstance(self.security.max_query_length, int) or self.security.max_query_length < 1:
-            raise ValueError(f"Invalid max query length: {self.security.max_query_length}")
-        
-        if not isinstance(self.security.max_response_length, int) or self.security.max_response_length < 1:
-            raise ValueError(f"Invalid max response length: {self.security.max_response_length}")
+        for section, attr, is_valid, description in self._VALIDATORS:
+            value = getattr(getattr(self, section), attr)
+            if not is_valid(value):
+                raise ConfigurationError(f"Invalid {description}: {value}")
         
         logger.info("Configuration validation completed successfully")
     
     def get_portal_url(self) -> str:
         """Get the full portal URL"""
-        return f"{self.portal.base_url.rstrip('/')}{self.portal.ai_platform_path}"
+        return self._portal_url
     
-    def get_browser_args(self) -> Dict[str, Any]:
-        """Get browser connection arguments"""
-        return {
-            'endpoint_url': f'http://localhost:{self.browser.debug_port}',
-            'slow_mo': self.browser.slow_mo,
-            'timeout': self.browser.timeout
-        }
+    def get_browser_args(self) -> Mapping[str, Any]:
+        """Get browser connection arguments (read-only)"""
+        return self._browser_args
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert configuration to dictionary"""
-        return {
-            'browser': {
-                'debug_port': self.browser.debug_port,
-                'user_data_dir': self.browser.user_data_dir,
-                'timeout': self.browser.timeout,
-                'headless': self.browser.headless,
-                'slow_mo': self.browser.slow_mo
-            },
-            'portal': {
-                'base_url': self.portal.base_url,
-                'ai_platform_path': self.portal.ai_platform_path,
-                'response_timeout': self.portal.response_timeout,
-                'retry_attempts': self.portal.retry_attempts,
-                'retry_delay': self.portal.retry_delay
-            },
-            'mcp': {
-                'server_name': self.mcp.server_name,
-                'server_version': self.mcp.server_version,
-                'log_level': self.mcp.log_level,
-                'max_concurrent_requests': self.mcp.max_concurrent_requests
-            },
-            'security': {
-                'enable_input_validation': self.security.enable_input_validation,
-                'sanitize_responses': self.security.sanitize_responses,
-                'max_query_length': self.security.max_query_length,
-                'max_response_length': self.security.max_response_length,
-                'allowed_domains': self.security.allowed_domains
+    def to_dict(self) -> Mapping[str, Mapping[str, Any]]:
+        """
+        Convert configuration to a read-only mapping of read-only sections.
+        Serialize with json.dumps(config.to_dict(), default=dict).
+        """
+        # Settings are fixed once loaded (reload_config builds a new Config),
+        # so the view is built once and shared by every caller
+        if self._dict_cache is None:
+            sections = {
+                'browser': asdict(self.browser),
+                'portal': asdict(self.portal),
+                'mcp': asdict(self.mcp),
+                'daemon': asdict(self.daemon),
+                'security': asdict(self.security)
             }
-        }
+            # Sets are not JSON serializable; a tuple also keeps the view immutable
+            sections['security']['allowed_domains'] = tuple(sorted(self.security.allowed_domains))
+            self._dict_cache = MappingProxyType({
+                name: MappingProxyType(section) for name, section in sections.items()
+            })
+        return self._dict_cache
 
-
-# Global configuration instance
-config = Config()
+# Global configuration instance, created on first use so importing this
+# module does not read the environment
+config: Optional[Config] = None
 
 
 def get_config() -> Config:
     """Get the global configuration instance"""
+    global config
+    if config is None:
+        config = Config()
     return config
 
 
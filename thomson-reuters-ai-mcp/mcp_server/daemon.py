@@ -0,0 +1,407 @@
+"""
+Background daemon for MCP AI Portal Agent
+Owns a single Playwright instance and BrowserAgent so CLI commands
+do not pay the browser connection cost on every invocation
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import os
+import secrets
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+# The daemon is spawned with -m from here so mcp_server is importable
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+from mcp_server import exceptions
+from mcp_server.config import get_config
+from mcp_server.event_loop import run_async
+from mcp_server.exceptions import BrowserConnectionError, MCPAgentError
+
+logger = logging.getLogger("daemon")
+
+# Responses can be up to max_response_length characters, which exceeds the
+# default 64 KiB StreamReader line limit once JSON-encoded
+STREAM_LIMIT = 16 * 1024 * 1024
+
+USE_UNIX_SOCKET = sys.platform != "win32"
+
+
+class AgentDaemon:
+    """Serves BrowserAgent commands over a local JSON-line socket"""
+
+    def __init__(self):
+        # Imported here so CLI clients importing DaemonClient never load Playwright
+        from mcp_server.browser_agent import BrowserAgent
+        
+        self.config = get_config()
+        self.browser_agent = BrowserAgent()
+        self.server: Optional[asyncio.AbstractServer] = None
+        self._lock_file = None  # Held while this daemon owns the socket path
+        self._socket_inode: Optional[int] = None  # Identifies the socket this daemon bound
+        self._token: Optional[str] = None  # Required from clients on the TCP fallback
+        self._clients = 0
+        self._last_activity = 0.0
+        # Serializes (re)connecting; page access is handled by the agent's page pool
+        self._lock = asyncio.Lock()
+        self._handlers = {
+            "connect": self._handle_connect,
+            "ask": self._handle_ask,
+            "ask_stream": self._handle_ask_stream,
+            "status": self._handle_status,
+            "models": self._handle_models,
+        }
+
+    async def start(self) -> bool:
+        """
+        Start listening and warm up the browser connection.
+        Returns False without listening when another daemon already owns the address.
+        """
+        self._last_activity = asyncio.get_running_loop().time()
+        if USE_UNIX_SOCKET:
+            socket_path = self.config.daemon.socket_path
+            if not self._acquire_lock(socket_path + ".lock"):
+                return False
+            if os.path.exists(socket_path):
+                # The lock is ours, so this was left behind by a daemon that did not shut down cleanly
+                os.unlink(socket_path)
+            self.server = await asyncio.start_unix_server(
+                self._handle_client, path=socket_path, limit=STREAM_LIMIT
+            )
+            os.chmod(socket_path, 0o600)
+            self._socket_inode = os.stat(socket_path).st_ino
+            logger.info(f"Daemon listening on {socket_path}")
+        else:
+            try:
+                self.server = await asyncio.start_server(
+                    self._handle_client, host="127.0.0.1", port=self.config.daemon.port, limit=STREAM_LIMIT
+                )
+            except OSError as e:
+                logger.info(f"Port {self.config.daemon.port} is already in use: {e}")
+                return False
+            # Any local process can reach the port, so clients must prove they can read this file
+            self._token = secrets.token_hex(32)
+            _write_private_file(self.config.daemon.token_file, self._token)
+            logger.info(f"Daemon listening on 127.0.0.1:{self.config.daemon.port}")
+
+        try:
+            async with self._lock:
+                await self._ensure_connected()
+        except BrowserConnectionError as e:
+            # Reported to clients on their first request; the next request retries
+            logger.error(f"Initial browser connection failed: {e}")
+        return True
+
+    async def serve_forever(self):
+        """Serve requests until cancelled or, with an idle timeout, until no client has been seen for it"""
+        idle_timeout = self.config.daemon.idle_timeout
+        if idle_timeout <= 0:
+            await asyncio.Event().wait()
+
+        loop = asyncio.get_running_loop()
+        while True:
+            idle_for = loop.time() - self._last_activity
+            if self._clients == 0 and idle_for >= idle_timeout:
+                logger.info(f"No clients for {idle_timeout} seconds, shutting down")
+                return
+            await asyncio.sleep(max(idle_timeout - idle_for, 5.0))
+
+    async def stop(self):
+        """Stop the daemon and clean up resources"""
+        logger.info("Stopping daemon...")
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.browser_agent.close()
+        from mcp_server.playwright_driver import stop_playwright
+        await stop_playwright()
+        self._remove_own_files()
+        if self._lock_file:
+            self._lock_file.close()
+            self._lock_file = None
+        logger.info("Daemon stopped")
+
+    def _acquire_lock(self, lock_path: str) -> bool:
+        """Take the exclusive lock that guards the socket path; False if another daemon holds it"""
+        import fcntl
+
+        lock_file = open(lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _remove_own_files(self):
+        """Remove the socket and token files, unless a newer daemon has replaced them"""
+        if self._socket_inode is not None:
+            socket_path = self.config.daemon.socket_path
+            try:
+                if os.stat(socket_path).st_ino == self._socket_inode:
+                    os.unlink(socket_path)
+            except FileNotFoundError:
+                pass
+            self._socket_inode = None
+        if self._token is not None:
+            token_file = self.config.daemon.token_file
+            try:
+                with open(token_file) as f:
+                    if f.read() == self._token:
+                        os.unlink(token_file)
+            except FileNotFoundError:
+                pass
+            self._token = None
+
+    async def _ensure_connected(self):
+        """Connect the browser agent once and reuse its page across requests"""
+        if self.browser_agent.page:
+            return
+        from mcp_server.playwright_driver import get_playwright
+        await self.browser_agent.connect_to_browser(await get_playwright())
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Process JSON-line requests from a single client connection"""
+        loop = asyncio.get_running_loop()
+        self._clients += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._last_activity = loop.time()
+
+                async def emit(chunk: str):
+                    writer.write(json.dumps({"chunk": chunk}).encode() + b"\n")
+                    await writer.drain()
+
+                response = await self._dispatch(line, emit)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            logger.debug("Client disconnected")
+        finally:
+            self._clients -= 1
+            self._last_activity = loop.time()
+            writer.close()
+
+    async def _dispatch(self, line: bytes, emit: Callable[[str], Awaitable[None]]) -> Dict[str, Any]:
+        """
+        Run a single request and wrap the result or error for the client.
+        Streaming handlers send intermediate chunks through emit first.
+        """
+        try:
+            request = json.loads(line)
+            command = request.get("command")
+            handler = self._handlers.get(command)
+            if self._token and not hmac.compare_digest(str(request.get("token") or ""), self._token):
+                return {"ok": False, "error_type": "BrowserConnectionError", "error": "Invalid daemon token"}
+            if not handler:
+                return {"ok": False, "error_type": "ValueError", "error": f"Unknown command '{command}'"}
+
+            async with self._lock:
+                await self._ensure_connected()
+            result = await handler(request, emit)
+            return {"ok": True, "result": result}
+        except Exception as e:
+            logger.error(f"Error handling daemon request: {e}")
+            return {"ok": False, "error_type": type(e).__name__, "error": str(e)}
+
+    async def _handle_connect(self, request: Dict[str, Any], emit) -> str:
+        return self.browser_agent.page.url
+
+    async def _handle_ask(self, request: Dict[str, Any], emit) -> str:
+        return await self.browser_agent.ask_ai(request.get("query", ""))
+
+    async def _handle_ask_stream(self, request: Dict[str, Any], emit) -> str:
+        chunks = []
+        async for chunk in self.browser_agent.ask_ai_stream(request.get("query", "")):
+            chunks.append(chunk)
+            await emit(chunk)
+        return "".join(chunks)
+
+    async def _handle_status(self, request: Dict[str, Any], emit) -> Dict[str, Any]:
+        return await self.browser_agent.check_portal_status()
+
+    async def _handle_models(self, request: Dict[str, Any], emit) -> list:
+        return await self.browser_agent.list_available_models()
+
+
+class DaemonClient:
+    """Client side of the daemon protocol used by the terminal interface"""
+
+    def __init__(self):
+        self.config = get_config()
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self._token: Optional[str] = None
+
+    async def connect(self, spawn: bool = True):
+        """Connect to a running daemon, starting one in the background if needed"""
+        try:
+            await self._open()
+            return
+        except OSError:
+            if not spawn:
+                raise BrowserConnectionError("Agent daemon is not running")
+
+        logger.info("Agent daemon not running, starting it...")
+        self._spawn()
+
+        # The socket is bound before the browser warm-up, so it usually appears
+        # within a second; poll quickly at first, then back off
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.config.daemon.startup_timeout
+        poll_interval = 0.05
+        while loop.time() < deadline:
+            await asyncio.sleep(poll_interval)
+            poll_interval = min(poll_interval * 2, 0.5)
+            try:
+                await self._open()
+                return
+            except OSError:
+                continue
+
+        raise BrowserConnectionError(
+            f"Agent daemon did not start within {self.config.daemon.startup_timeout} seconds"
+        )
+
+    async def request(self, command: str, **params) -> Any:
+        """Send a command and return its result, re-raising daemon-side errors"""
+        result = None
+        async for chunk, result in self._exchange(command, params):
+            pass
+        return result
+
+    async def stream(self, command: str, **params) -> AsyncIterator[str]:
+        """Send a streaming command and yield its chunks as they arrive"""
+        async for chunk, _ in self._exchange(command, params):
+            if chunk is not None:
+                yield chunk
+
+    async def _exchange(self, command: str, params: Dict[str, Any]) -> AsyncIterator[tuple]:
+        """Yield (chunk, None) for streamed chunks, then (None, result)"""
+        if not self.writer:
+            # Dropped after an interrupted request; reconnect transparently
+            await self.connect()
+
+        completed = False
+        try:
+            request = {"command": command, **params}
+            if not USE_UNIX_SOCKET:
+                request["token"] = self._token or self._read_token()
+            self.writer.write(json.dumps(request).encode() + b"\n")
+            await self.writer.drain()
+
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    raise BrowserConnectionError("Agent daemon closed the connection")
+
+                response = json.loads(line)
+                if "chunk" in response:
+                    yield response["chunk"], None
+                    continue
+
+                completed = True
+                if response.get("ok"):
+                    yield None, response.get("result")
+                    return
+                raise _rebuild_error(response.get("error_type"), response.get("error", "Unknown daemon error"))
+        finally:
+            if not completed:
+                # A response may still be in flight; drop the connection so it
+                # is never read as the answer to the next request
+                await self.close()
+
+    async def close(self):
+        """Close the connection; the daemon keeps running"""
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionResetError, BrokenPipeError):
+                pass
+            self.reader = None
+            self.writer = None
+
+    async def _open(self):
+        if USE_UNIX_SOCKET:
+            self.reader, self.writer = await asyncio.open_unix_connection(
+                self.config.daemon.socket_path, limit=STREAM_LIMIT
+            )
+        else:
+            self.reader, self.writer = await asyncio.open_connection(
+                "127.0.0.1", self.config.daemon.port, limit=STREAM_LIMIT
+            )
+            self._token = self._read_token()
+
+    def _read_token(self) -> Optional[str]:
+        """Read the token the daemon wrote for clients of the TCP fallback"""
+        try:
+            with open(self.config.daemon.token_file) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _spawn(self):
+        log_file = Path(self.config.daemon.log_file)
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(log_file, "ab") as log:
+            subprocess.Popen(
+                [sys.executable, "-m", "mcp_server.daemon"],
+                cwd=project_root,
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=log,
+                start_new_session=True,
+            )
+
+
+def _write_private_file(path: str, content: str):
+    """Write content to a file only the current user can read"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    if os.path.exists(path):
+        os.unlink(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(content)
+
+
+def _rebuild_error(error_type: Optional[str], message: str) -> Exception:
+    """Map a daemon-side exception name back to the matching local exception class"""
+    if error_type == "ValueError":
+        return ValueError(message)
+    error_class = getattr(exceptions, error_type or "", None)
+    if isinstance(error_class, type) and issubclass(error_class, MCPAgentError):
+        return error_class(message)
+    return MCPAgentError(message)
+
+
+async def main():
+    """Entry point for the agent daemon"""
+    logging.basicConfig(
+        level=get_config().mcp.log_level,
+        format="%(asctime)s %(name)s %(levelname)s %(message)s",
+    )
+    daemon = AgentDaemon()
+    try:
+        if not await daemon.start():
+            logger.info("Another agent daemon is already running")
+            return
+        await daemon.serve_forever()
+    finally:
+        await daemon.stop()
+
+
+if __name__ == "__main__":
+    try:
+        run_async(main())
+    except KeyboardInterrupt:
+        logger.info("Agent daemon stopped by user")
@@ -0,0 +1,24 @@
+"""
+Event loop helpers for MCP AI Portal Agent entry points
+Runs coroutines on uvloop when it is installed, falling back to asyncio
+"""
+
+import asyncio
+
+# uvloop is optional and unavailable on Windows
+try:
+    import uvloop
+    _loop_factory = uvloop.new_event_loop
+except ImportError:
+    _loop_factory = None
+
+
+def run_async(coro):
+    """Run a coroutine on a fresh event loop, using uvloop when installed"""
+    if hasattr(asyncio, "Runner"):
+        with asyncio.Runner(loop_factory=_loop_factory) as runner:
+            return runner.run(coro)
+    # Python < 3.11
+    if _loop_factory:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return asyncio.run(coro)
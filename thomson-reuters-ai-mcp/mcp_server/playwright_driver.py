@@ -0,0 +1,46 @@
+"""
+Shared Playwright driver for MCP AI Portal Agent
+Starts the Playwright driver process once per event loop so server and daemon
+restarts of the browser connection do not pay its start-up cost again
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from playwright.async_api import Playwright, async_playwright
+
+logger = logging.getLogger(__name__)
+
+_instance: Optional[Playwright] = None
+_instance_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock: Optional[asyncio.Lock] = None
+
+
+async def get_playwright() -> Playwright:
+    """Return the running Playwright instance, starting it on first use"""
+    global _instance, _instance_loop, _lock
+    loop = asyncio.get_running_loop()
+    if _instance_loop is not loop:
+        # Left over from an earlier event loop, which took its driver with it
+        _instance, _instance_loop, _lock = None, loop, None
+    if _lock is None:
+        _lock = asyncio.Lock()
+
+    async with _lock:
+        if _instance is None:
+            _instance = await async_playwright().start()
+            logger.debug("Playwright driver started")
+        return _instance
+
+
+async def stop_playwright():
+    """Stop the shared Playwright instance; only called when shutting down"""
+    global _instance
+    instance, _instance = _instance, None
+    if instance:
+        try:
+            await instance.stop()
+            logger.debug("Playwright driver stopped")
+        except Exception as e:
+            logger.error(f"Error stopping Playwright: {e}")
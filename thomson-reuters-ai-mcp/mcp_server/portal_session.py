@@ -0,0 +1,151 @@
+"""
+Shared browser session helpers for MCP AI Portal Agent
+Connects to the existing Edge browser over CDP and reuses an already-open
+portal tab instead of navigating a new one
+"""
+
+import asyncio
+import json
+import logging
+import urllib.request
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from playwright.async_api import Browser, Page
+
+from .config import Config, get_config
+from .exceptions import BrowserConnectionError
+
+logger = logging.getLogger(__name__)
+
+PORTAL_URL_PART = "dataandanalytics.int.thomsonreuters.com/ai-platform"
+CDP_CACHE_FILE = Path.home() / ".cache" / "mcp-agent" / "cdp.json"
+
+# Waits between debug port probes, about 3 seconds in total, so a browser
+# that is still starting up is given time to open the port
+DEBUG_PORT_RETRY_DELAYS = (0.1, 0.2, 0.4, 0.8, 1.5)
+DEBUG_PORT_PROBE_TIMEOUT = 1.0  # seconds per connect attempt
+
+# Live CDP connections by debug port, shared by every agent in the process
+_browsers: Dict[int, Browser] = {}
+
+
+async def get_or_open_portal(playwright_instance, config: Optional[Config] = None) -> Tuple[Browser, Page]:
+    """
+    Connect to the browser and return the tab to drive. A tab already showing
+    the portal is preferred so its loaded state survives; otherwise the first
+    tab is used, or a new one is opened. The caller navigates if needed.
+    """
+    config = config or get_config()
+    browser = await connect_over_cdp(playwright_instance, config)
+
+    page = find_portal_page(browser)
+    if page:
+        logger.info(f"Reusing open portal tab: {page.url}")
+        return browser, page
+
+    if browser.contexts and browser.contexts[0].pages:
+        return browser, browser.contexts[0].pages[0]
+
+    context = await browser.new_context()
+    return browser, await context.new_page()
+
+
+def find_portal_page(browser: Browser) -> Optional[Page]:
+    """Return the first open tab already showing the AI portal, if any"""
+    for context in browser.contexts:
+        for page in context.pages:
+            if PORTAL_URL_PART in page.url:
+                return page
+    return None
+
+
+async def connect_over_cdp(playwright_instance, config: Optional[Config] = None) -> Browser:
+    """
+    Connect over CDP, reusing this process's connection while it is alive
+    and otherwise preferring the cached browser WebSocket endpoint
+    """
+    config = config or get_config()
+    browser = _browsers.get(config.browser.debug_port)
+    if browser and browser.is_connected():
+        return browser
+    
+    browser = await _connect(playwright_instance, config)
+    _browsers[config.browser.debug_port] = browser
+    return browser
+
+
+async def _connect(playwright_instance, config: Config) -> Browser:
+    """Open a new CDP connection to the browser"""
+    timeout = config.browser.timeout
+    await wait_for_debug_port(config.browser.debug_port)
+
+    cached_endpoint = _load_cached_endpoint(config.browser.debug_port)
+
+    if cached_endpoint:
+        try:
+            return await playwright_instance.chromium.connect_over_cdp(cached_endpoint, timeout=timeout)
+        except Exception as e:
+            logger.debug(f"Cached CDP endpoint {cached_endpoint} is stale: {e}")
+
+    endpoint_url = f"http://localhost:{config.browser.debug_port}"
+    logger.info(f"Resolving browser WebSocket endpoint from {endpoint_url}")
+    loop = asyncio.get_running_loop()
+    ws_endpoint = await loop.run_in_executor(None, _resolve_ws_endpoint, endpoint_url, timeout / 1000)
+
+    browser = await playwright_instance.chromium.connect_over_cdp(ws_endpoint, timeout=timeout)
+    _save_cached_endpoint(config.browser.debug_port, ws_endpoint)
+    return browser
+
+
+async def wait_for_debug_port(debug_port: int):
+    """
+    Wait briefly for the browser's debug port to accept TCP connections.
+    When the port is already up this costs one local connect instead of a
+    failed CDP handshake.
+    """
+    for delay in DEBUG_PORT_RETRY_DELAYS + (None,):
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection("localhost", debug_port), timeout=DEBUG_PORT_PROBE_TIMEOUT
+            )
+            writer.close()
+            return
+        except (OSError, asyncio.TimeoutError):
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+
+    raise BrowserConnectionError(
+        f"Edge debug port {debug_port} not reachable. "
+        f"Start Edge with --remote-debugging-port={debug_port} (see start-edge-debug.bat)"
+    )
+
+
+def _resolve_ws_endpoint(endpoint_url: str, timeout: float) -> str:
+    """Look up the browser WebSocket URL from the DevTools HTTP endpoint"""
+    with urllib.request.urlopen(f"{endpoint_url}/json/version", timeout=timeout) as response:
+        return json.load(response)["webSocketDebuggerUrl"]
+
+
+def _load_cached_endpoint(debug_port: int) -> Optional[str]:
+    """Return the cached WebSocket endpoint for the given debug port, if any"""
+    try:
+        cached = json.loads(CDP_CACHE_FILE.read_text())
+        if cached.get("debug_port") == debug_port:
+            return cached.get("ws_endpoint")
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _save_cached_endpoint(debug_port: int, ws_endpoint: str):
+    """Cache the WebSocket endpoint so later connections skip the HTTP lookup"""
+    try:
+        CDP_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        CDP_CACHE_FILE.write_text(json.dumps({
+            "debug_port": debug_port,
+            "ws_endpoint": ws_endpoint
+        }))
+    except OSError as e:
+        logger.debug(f"Could not cache CDP endpoint: {e}")
@@ -1,29 +1,58 @@
-import asyncio
+import functools
 import logging
 import sys
-import os
 import json
-from typing import List, Dict, Any, Union
-
-# Add the project root to the Python path if not already present
-project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
-
-import anyio
-from playwright.async_api import async_playwright
+from typing import Any, Dict, List, Optional, Tuple
 
 import mcp.types as types
-from mcp.server.models import InitializationOptions
 from mcp.server.lowlevel import Server
 from mcp.server.stdio import stdio_server
 
 from mcp_server.browser_agent import BrowserAgent
-from mcp_server.exceptions import BrowserConnectionError
+from mcp_server.event_loop import run_async
+from mcp_server.playwright_driver import get_playwright, stop_playwright
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("server")
 
+# orjson is optional; it serializes tool results about twice as fast
+try:
+    import orjson
+    
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, indent=2)
+
+
+def _log_errors(label: str):
+    """Log a method's exception with a label, then re-raise it"""
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await method(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"{label} failed: {e}")
+                raise
+        return wrapper
+    return decorator
+
+
+def _report_errors(tool_name: str):
+    """Log a tool handler's exception and return it to the client as error text"""
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(self, arguments: Dict[str, Any]) -> List[types.TextContent]:
+            try:
+                return await handler(self, arguments)
+            except Exception as e:
+                logger.error(f"Error in {tool_name}: {e}")
+                return [types.TextContent(type="text", text=f"Error: {str(e)}")]
+        return wrapper
+    return decorator
+
 
 class MCPServer(Server):
     def __init__(self, playwright_instance):
@@ -72,144 +101,127 @@ class MCPServer(Server):
                 }
             )
         ]
+        self._handlers = {
+            "ask_ai": self._handle_ask_ai,
+            "check_portal_status": self._handle_check_portal_status,
+            "list_available_models": self._handle_list_available_models,
+            "get_portal_session": self._handle_get_portal_session,
+        }
+        # Last model list and its serialized TextContent, reused while unchanged;
+        # the other tools' results carry timestamps, so they never repeat
+        self._models_content: Optional[Tuple[List[str], types.TextContent]] = None
         
-        # Register tool handlers using decorators
-        self._register_handlers()
+        # Register the handlers; they are methods, so no closures are built per instance
+        self.list_tools()(self._handle_list_tools)
+        self.call_tool()(self._handle_tool_call)
     
-    def _register_handlers(self):
-        """Register all tool handlers using the new decorator pattern"""
+    async def _handle_tool_call(self, name: str, arguments: Dict[str, Any]) -> List[types.TextContent]:
+        """Handle all tool calls"""
+        logger.info(f"Tool called: {name}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Tool {name} arguments: {arguments}")
         
-        @self.call_tool()
-        async def handle_tools(name: str, arguments: Dict[str, Any]) -> List[types.TextContent]:
-            """Handle all tool calls"""
-            logger.info(f"Tool called: {name} with arguments: {arguments}")
-            
-            try:
-                if name == "ask_ai":
-                    return await self._handle_ask_ai(arguments)
-                elif name == "check_portal_status":
-                    return await self._handle_check_portal_status(arguments)
-                elif name == "list_available_models":
-                    return await self._handle_list_available_models(arguments)
-                elif name == "get_portal_session":
-                    return await self._handle_get_portal_session(arguments)
-                else:
-                    return [types.TextContent(
-                        type="text", 
-                        text=f"Error: Unknown tool '{name}'"
-                    )]
-            except Exception as e:
-                logger.error(f"Error in tool {name}: {e}")
-                return [types.TextContent(
-                    type="text", 
-                    text=f"Error: {str(e)}"
-                )]
+        handler = self._handlers.get(name)
+        if not handler:
+            return [types.TextContent(
+                type="text", 
+                text=f"Error: Unknown tool '{name}'"
+            )]
+        
+        # Each handler reports its own errors through @_report_errors
+        return await handler(arguments)
     
-    async def list_tools(self) -> List[types.Tool]:
-        """Return the list of available tools"""
+    async def _handle_list_tools(self) -> List[types.Tool]:
+        """Return the list of available tools, built once in __init__"""
         return self._tools
     
+    @_report_errors("ask_ai")
     async def _handle_ask_ai(self, arguments: Dict[str, Any]) -> List[types.TextContent]:
         """Handle ask_ai tool call"""
         query = arguments.get("query")
         if not query:
             return [types.TextContent(type="text", text="Error: 'query' parameter is required")]
         
-        logger.info(f"ask_ai called with query: {query}")
-        try:
-            response_text = await self.browser_agent.ask_ai(query)
-            logger.info(f"AI response received: {response_text[:100]}...")
-            return [types.TextContent(type="text", text=response_text)]
-        except Exception as e:
-            logger.error(f"Error in ask_ai: {e}")
-            return [types.TextContent(type="text", text=f"Error: {str(e)}")]
+        logger.info(f"ask_ai called with a {len(query)}-character query")
+        response_text = await self.browser_agent.ask_ai(query)
+        logger.info(f"AI response received ({len(response_text)} characters)")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"AI response: {response_text}")
+        return [types.TextContent(type="text", text=response_text)]
     
+    @_report_errors("check_portal_status")
     async def _handle_check_portal_status(self, arguments: Dict[str, Any]) -> List[types.TextContent]:
         """Handle check_portal_status tool call"""
         logger.info("check_portal_status called")
-        try:
-            status = await self.browser_agent.check_portal_status()
-            status_text = json.dumps(status, indent=2)
-            return [types.TextContent(type="text", text=status_text)]
-        except Exception as e:
-            logger.error(f"Error in check_portal_status: {e}")
-            return [types.TextContent(type="text", text=f"Error: {str(e)}")]
+        status = await self.browser_agent.check_portal_status()
+        return [types.TextContent(type="text", text=_dumps(status))]
     
+    @_report_errors("list_available_models")
     async def _handle_list_available_models(self, arguments: Dict[str, Any]) -> List[types.TextContent]:
         """Handle list_available_models tool call"""
         logger.info("list_available_models called")
-        try:
-            models = await self.browser_agent.list_available_models()
-            models_text = json.dumps(models, indent=2)
-            return [types.TextContent(type="text", text=models_text)]
-        except Exception as e:
-            logger.error(f"Error in list_available_models: {e}")
-            return [types.TextContent(type="text", text=f"Error: {str(e)}")]
+        models = await self.browser_agent.list_available_models()
+        if self._models_content is None or self._models_content[0] != models:
+            self._models_content = (models, types.TextContent(type="text", text=_dumps(models)))
+        return [self._models_content[1]]
     
+    @_report_errors("get_portal_session")
     async def _handle_get_portal_session(self, arguments: Dict[str, Any]) -> List[types.TextContent]:
         """Handle get_portal_session tool call"""
         logger.info("get_portal_session called")
-        try:
-            session = await self.browser_agent.get_portal_session()
-            session_text = json.dumps(session, indent=2)
-            return [types.TextContent(type="text", text=session_text)]
-        except Exception as e:
-            logger.error(f"Error in get_portal_session: {e}")
-            return [types.TextContent(type="text", text=f"Error: {str(e)}")]
+        session = await self.browser_agent.get_portal_session()
+        return [types.TextContent(type="text", text=_dumps(session))]
 
+    @_log_errors("Starting MCP server")
     async def start(self):
         """Start the MCP server and connect to browser"""
-        try:
-            await self.browser_agent.connect_to_browser(self.playwright_instance)
-            logger.info("MCP Server started and browser connected successfully")
-        except BrowserConnectionError as e:
-            logger.error(f"Failed to start MCP server: {e}")
-            raise
-        except Exception as e:
-            logger.error(f"Unexpected error starting MCP server: {e}")
-            raise
+        await self.browser_agent.connect_to_browser(self.playwright_instance)
+        logger.info("MCP Server started and browser connected successfully")
 
+    @_log_errors("Stopping MCP server")
     async def stop(self):
         """Stop the MCP server and clean up resources"""
         logger.info("Stopping MCP server...")
-        try:
-            if self.browser_agent:
-                await self.browser_agent.close()
-            if self.playwright_instance:
-                await self.playwright_instance.stop()
-            logger.info("MCP server stopped successfully")
-        except Exception as e:
-            logger.error(f"Error stopping MCP server: {e}")
-            raise
+        # The shared Playwright instance outlives the server; main() stops it
+        if self.browser_agent:
+            await self.browser_agent.close()
+        logger.info("MCP server stopped successfully")
 
 
 async def main():
     """Entry point for the MCP server. Ensures graceful shutdown."""
     logger.info("Starting MCP AI Portal Agent server...")
     
-    async with async_playwright() as playwright_instance:
-        server = MCPServer(playwright_instance)
+    server = MCPServer(await get_playwright())
+    try:
+        await server.start()
+        logger.info("MCP server is ready to accept connections")
+        
+        async with stdio_server() as (read_stream, write_stream):
+            initialization_options = server.create_initialization_options()
+            await server.run(read_stream, write_stream, initialization_options)
+    except KeyboardInterrupt:
+        logger.info("Received interrupt signal, shutting down gracefully...")
+    except Exception as e:
+        logger.error(f"Server error: {e}")
+        raise
+    finally:
         try:
-            await server.start()
-            logger.info("MCP server is ready to accept connections")
-            
-            async with stdio_server() as (read_stream, write_stream):
-                initialization_options = server.create_initialization_options()
-                await server.run(read_stream, write_stream, initialization_options)
-        except KeyboardInterrupt:
-            logger.info("Received interrupt signal, shutting down gracefully...")
-        except Exception as e:
-            logger.error(f"Server error: {e}")
-            raise
-        finally:
             await server.stop()
+        finally:
+            await stop_playwright()
 
 
-if __name__ == "__main__":
+def run():
+    """Console script entry point; runs main() on uvloop when available"""
     try:
-        asyncio.run(main())
+        run_async(main())
     except KeyboardInterrupt:
         logger.info("MCP server stopped by user")
     except Exception as e:
         logger.error(f"Fatal error: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run()
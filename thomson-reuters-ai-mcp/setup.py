@@ -10,18 +10,21 @@ setup(
     version="1.0.0",
     description="MCP AI Portal Agent for Thomson Reuters AI Platform",
     author="Thomson Reuters",
-    packages=find_packages(),
+    packages=find_packages(include=["mcp_server*", "src*", "cli*"]),
+    # The daemon is spawned from the project root found via __file__
+    zip_safe=False,
     python_requires=">=3.8",
     install_requires=[
         "playwright>=1.40.0",
         "mcp>=0.5.0",
         "python-dotenv>=1.0.0",
         "click>=8.0.0",
+        "uvloop>=0.17.0; platform_system != 'Windows'",
     ],
     entry_points={
         "console_scripts": [
             "mcp-ai-portal=cli.terminal_interface:cli",
-            "mcp-ai-server=mcp_server.server:main",
+            "mcp-ai-server=mcp_server.server:run",
         ],
     },
     classifiers=[
@@ -1,76 +1,395 @@
 import asyncio
 import logging
-import time
-import sys
-import os
-from typing import Optional, List, Dict, Any
-from playwright.async_api import Page
+import re
+from typing import Optional, List, Dict, Any, AsyncIterator
+from playwright.async_api import Locator, Page, expect
 
-# Add the project root to the Python path for importing exceptions
-project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
-
-from mcp_server.exceptions import TimeoutError
+from mcp_server.exceptions import OperationTimeoutError
 
 logger = logging.getLogger(__name__)
 
+AI_MESSAGE_SELECTOR = 'saf-message-box[appearance="agent"]'
+
+# Response lines that are portal chrome rather than answer text, matched
+# case-insensitively without lowering a copy of every line
+COST_LINE_RE = re.compile(r'query cost|usd|\$', re.IGNORECASE)
+MODEL_LINE_RE = re.compile(r'claude.*sonnet|sonnet.*claude', re.IGNORECASE)
+
+# Selector syntax only Playwright's engine understands; such selectors cannot
+# be joined into CSS selector lists or evaluated with querySelectorAll
+PLAYWRIGHT_ONLY_MARKERS = (':has-text(', 'text=', ' >> ')
+
+
+def _is_playwright_only(selector: str) -> bool:
+    return any(marker in selector for marker in PLAYWRIGHT_ONLY_MARKERS)
+
+
+# Any loading indicator, as one CSS selector list so a single query answers
+# whether the page is still loading
+LOADING_SELECTOR = ', '.join([
+    '[data-testid="loading"]',
+    '.loading',
+    '[class*="loading"]',
+    '[class*="spinner"]',
+    '[aria-label*="loading"]',
+])
+
+# querySelectorAll that also searches open shadow roots, matching Playwright's
+# CSS engine, since the SAF components render inside them
+DEEP_QUERY_ALL_JS = """const deepQueryAll = (selector, root = document) => {
+        const found = [...root.querySelectorAll(selector)];
+        for (const el of [root, ...root.querySelectorAll('*')]) {
+            if (el.shadowRoot) found.push(...deepQueryAll(selector, el.shadowRoot));
+        }
+        return found;
+    };"""
+
+# Collects text and vertical position for every match of each selector in a
+# single round-trip
+COLLECT_ELEMENTS_JS = """(selectors) => {
+    """ + DEEP_QUERY_ALL_JS + """
+    return selectors.map(selector => deepQueryAll(selector).map(el => ({
+        text: el.textContent || '',
+        position: el.getBoundingClientRect().y
+    })));
+}"""
+
+COUNT_ELEMENTS_JS = """(selector) => {
+    """ + DEEP_QUERY_ALL_JS + """
+    return deepQueryAll(selector).length;
+}"""
+
+# Counts matches for every selector in one round-trip; a selector the page
+# cannot parse, such as Playwright's :has-text(), counts as -1
+COUNT_SELECTORS_JS = """(selectors) => {
+    """ + DEEP_QUERY_ALL_JS + """
+    return selectors.map(selector => {
+        try {
+            return deepQueryAll(selector).length;
+        } catch (e) {
+            return -1;
+        }
+    });
+}"""
+
+# Snapshot for get_page_info: whether a chat input is visible, message counts
+# per selector and then per div text pattern (as _get_message_count takes
+# them), and whether any loading indicator is present
+PAGE_STATE_JS = """({chatInputSelectors, messageSelectors, textPatterns, loadingSelector}) => {
+    """ + DEEP_QUERY_ALL_JS + """
+    const count = selector => {
+        try {
+            return deepQueryAll(selector).length;
+        } catch (e) {
+            return -1;
+        }
+    };
+    const messageCounts = messageSelectors.map(count);
+    if (!messageCounts.some(n => n > 0)) {
+        // The text fallback walks every div, so it only runs when needed
+        const divTexts = deepQueryAll('div').map(el => (el.textContent || '').replace(/\\s+/g, ' ').toLowerCase());
+        messageCounts.push(...textPatterns.map(p => divTexts.filter(text => text.includes(p.toLowerCase())).length));
+    }
+    return {
+        chatInterfaceDetected: chatInputSelectors.some(
+            selector => deepQueryAll(selector).some(el => el.getClientRects().length > 0)
+        ),
+        messageCounts,
+        loadingComplete: count(loadingSelector) === 0,
+    };
+}"""
+
+# Returns the text of the last match of each selector (null when there is
+# none) in one round-trip
+LAST_TEXTS_JS = """(selectors) => {
+    """ + DEEP_QUERY_ALL_JS + """
+    return selectors.map(selector => {
+        try {
+            const found = deepQueryAll(selector);
+            return found.length ? (found[found.length - 1].innerText || '') : null;
+        } catch (e) {
+            return null;
+        }
+    });
+}"""
+
+# Counts, in one pass over the given elements, how many contain each text
+# pattern. Mirrors Playwright's :has-text() matching (case-insensitive,
+# whitespace-normalized) without one full-document scan per pattern.
+TEXT_MATCH_COUNTS_JS = """({tag, patterns}) => {
+    """ + DEEP_QUERY_ALL_JS + """
+    const needles = patterns.map(p => p.toLowerCase());
+    const counts = needles.map(() => 0);
+    for (const el of deepQueryAll(tag)) {
+        const text = (el.textContent || '').replace(/\\s+/g, ' ').toLowerCase();
+        needles.forEach((needle, i) => {
+            if (text.includes(needle)) counts[i]++;
+        });
+    }
+    return counts;
+}"""
+
+# For each content selector, returns the visible elements inside the newest
+# message box whose text is longer than minLength, in document order
+SUBSTANTIAL_TEXTS_JS = """({selector, contentSelectors, minLength, limit}) => {
+    """ + DEEP_QUERY_ALL_JS + """
+    const boxes = deepQueryAll(selector);
+    if (!boxes.length) return [];
+    const box = boxes[boxes.length - 1];
+    return contentSelectors.map(contentSelector => {
+        const texts = [];
+        for (const el of deepQueryAll(contentSelector, box)) {
+            if (el.getClientRects().length === 0) continue;
+            const text = el.innerText || '';
+            if (text.trim().length <= minLength) continue;
+            texts.push(text);
+            if (texts.length >= limit) break;
+        }
+        return texts;
+    });
+}"""
+
+# Returns the first sentence containing one of the patterns (tried in order)
+# that does not look like a user question. Only the newest AI message is
+# scanned when there is one, rather than the whole transcript.
+FIND_RESPONSE_SENTENCE_JS = """({patterns, selector}) => {
+    """ + DEEP_QUERY_ALL_JS + """
+    const boxes = deepQueryAll(selector);
+    const scope = boxes.length ? boxes[boxes.length - 1] : document.body;
+    const sentences = (scope.innerText || '').split('.');
+    for (const pattern of patterns) {
+        const needle = pattern.toLowerCase();
+        for (const sentence of sentences) {
+            if (!sentence.toLowerCase().includes(needle)) continue;
+            const trimmed = sentence.trim();
+            if (sentence.includes('?') || trimmed.startsWith('What') || trimmed.startsWith('How')) continue;
+            return trimmed + '.';
+        }
+    }
+    return null;
+}"""
+
+# Resolves with the text of the newest AI message once a message beyond the
+# baseline exists and its text has stopped changing for stableMs, i.e. the
+# model has finished streaming, or with null after timeoutMs. Changes are
+# pushed by a MutationObserver, coalesced with a short timer, and a slow
+# interval catches changes inside shadow roots. Checks compare textContent,
+# which needs no layout; the rendered innerText is read once, at the end.
+WAIT_RESPONSE_STABLE_JS = """({selector, baseline, stableMs, timeoutMs}) => new Promise(resolve => {
+    """ + DEEP_QUERY_ALL_JS + """
+    let lastRaw = null;
+    let scheduled = false;
+    let settleTimer = null;
+    const latest = () => {
+        const boxes = deepQueryAll(selector);
+        if (boxes.length <= baseline) return null;
+        const box = boxes[boxes.length - 1];
+        return deepQueryAll('[data-testid="remark-wrapper"]', box)[0] || box;
+    };
+    const finish = (value) => {
+        observer.disconnect();
+        clearInterval(timer);
+        clearTimeout(settleTimer);
+        clearTimeout(deadline);
+        resolve(value);
+    };
+    const settle = () => {
+        const content = latest();
+        const raw = content ? (content.textContent || '').trim() : '';
+        if (raw && raw === lastRaw) {
+            finish((content.innerText || '').trim() || raw);
+        } else {
+            check();
+        }
+    };
+    const check = () => {
+        scheduled = false;
+        const content = latest();
+        if (!content) return;
+        const raw = (content.textContent || '').trim();
+        if (!raw || raw === lastRaw) return;
+        lastRaw = raw;
+        clearTimeout(settleTimer);
+        settleTimer = setTimeout(settle, stableMs);
+    };
+    const schedule = () => {
+        if (!scheduled) {
+            scheduled = true;
+            setTimeout(check, 50);
+        }
+    };
+    const observer = new MutationObserver(schedule);
+    observer.observe(document.body, {subtree: true, childList: true, characterData: true});
+    const timer = setInterval(check, 250);
+    const deadline = setTimeout(() => finish(null), timeoutMs);
+    check();
+})"""
+
+STREAM_BINDING = "mcpPush"
+
+# Pushes the newest AI message text to the exposed binding whenever it
+# changes. Mutations are coalesced with a short timer, and a slow interval
+# catches changes inside shadow roots, which the document observer cannot see.
+STREAM_OBSERVER_JS = """({selector, baseline, binding}) => {
+    """ + DEEP_QUERY_ALL_JS + """
+    if (window.__mcpStreamStop) window.__mcpStreamStop();
+    let last = null;
+    let lastRaw = null;
+    let scheduled = false;
+    const check = () => {
+        scheduled = false;
+        const boxes = deepQueryAll(selector);
+        if (boxes.length <= baseline) return;
+        const box = boxes[boxes.length - 1];
+        const content = deepQueryAll('[data-testid="remark-wrapper"]', box)[0] || box;
+        // Only pay for the layout innerText needs when the content changed
+        const raw = content.textContent || '';
+        if (raw === lastRaw) return;
+        lastRaw = raw;
+        const text = content.innerText || '';
+        if (text && text !== last) {
+            last = text;
+            window[binding](text);
+        }
+    };
+    const schedule = () => {
+        if (!scheduled) {
+            scheduled = true;
+            setTimeout(check, 50);
+        }
+    };
+    const observer = new MutationObserver(schedule);
+    observer.observe(document.body, {subtree: true, childList: true, characterData: true});
+    const timer = setInterval(check, 250);
+    window.__mcpStreamStop = () => {
+        observer.disconnect();
+        clearInterval(timer);
+        delete window.__mcpStreamStop;
+    };
+}"""
+
+STREAM_STOP_JS = "() => window.__mcpStreamStop && window.__mcpStreamStop()"
+
+# Precedes the full final response when a stream's earlier text was rewritten
+REVISED_MARKER = "[Revised response]"
+REVISED_PREFIX = f"\n{REVISED_MARKER}\n"
+
 
 class PortalInterface:
+    # How long the newest AI message must stay unchanged to count as complete
+    response_stable_ms = 400
+    # Total time the send button candidates get to become enabled after filling
+    send_enable_ms = 500
+    # Selector fallbacks are fixed, so they are built once for all instances
+    response_selectors = [
+        # SAF-based selectors (Thomson Reuters UI framework)
+        'saf-message-box[appearance="agent"] [data-testid="remark-wrapper"]',
+        'saf-message-box[appearance="agent"]',
+        'saf-chat-message[type="response"]',
+        'saf-response-content',
+        
+        # Standard selectors
+        '[data-testid="message-content"]',
+        '[data-testid="remark-wrapper"]',
+        '.message-content',
+        '[class*="response"]',
+        '[class*="message"]',
+        'div[role="article"]',
+        
+        # Generic text-based selectors
+        '*:has-text("The answer")',
+        '*:has-text("equals")',
+        '*:has-text("is 4")',
+        '*:has-text("2+2")',
+        'div:has-text("4")',
+        'p:has-text("4")',
+    ]
+    chat_input_selectors = [
+        'textarea[placeholder*="Type your message"]',
+        'textarea[placeholder*="message"]',
+        'input[placeholder*="Type your message"]',
+        'textarea[aria-label*="message"]',
+        '[role="textbox"]',
+        'textarea',
+        'input[type="text"]'
+    ]
+    send_button_selectors = [
+        # SAF-based send button selectors
+        'saf-button[aria-label*="Send"]',
+        'button[aria-label*="Send"]',
+        'saf-icon-button[aria-label*="Send"]',
+        
+        # Generic send button selectors
+        'button:has-text("Send")',
+        'button[type="submit"]',
+        '[data-testid="send-button"]',
+        'button:has([class*="send"])',
+        'button:has([class*="submit"])',
+        'button[title*="Send"]',
+        
+        # Icon-based selectors (for buttons with only icons)
+        'button:has(saf-icon[icon-name*="arrow"])',
+        'button:has(saf-icon[icon-name*="send"])',
+        'button svg[class*="send"]',
+        'button:has([class*="arrow"])',
+    ]
+    # Plain CSS send buttons are probed together in the page; the rest are
+    # only tried through Playwright when none of those is present
+    send_button_css_selectors = [s for s in send_button_selectors if not _is_playwright_only(s)]
+    send_button_engine_selectors = [s for s in send_button_selectors if _is_playwright_only(s)]
+    # Message containers, in priority order, for counting messages
+    message_selectors = [
+        '[data-testid="message"]',
+        '.message',
+        '[class*="message"]',
+        '[role="article"]',
+    ]
+    # Last-resort text matches on divs when no container selector matches
+    message_text_patterns = ['The capital', 'Paris']
+    # Every chat input selector is plain CSS, so one selector list can wait for any of them
+    any_chat_input_selector = ', '.join(chat_input_selectors) + ' >> visible=true'
+
     def __init__(self, page: Page):
         self.page = page
-        self.response_selectors = [
-            # SAF-based selectors (Thomson Reuters UI framework)
-            'saf-message-box[appearance="agent"] [data-testid="remark-wrapper"]',
-            'saf-message-box[appearance="agent"]',
-            'saf-chat-message[type="response"]',
-            'saf-response-content',
-            
-            # Standard selectors
-            '[data-testid="message-content"]',
-            '[data-testid="remark-wrapper"]',
-            '.message-content',
-            '[class*="response"]',
-            '[class*="message"]',
-            'div[role="article"]',
-            
-            # Generic text-based selectors
-            '*:has-text("The answer")',
-            '*:has-text("equals")',
-            '*:has-text("is 4")',
-            '*:has-text("2+2")',
-            'div:has-text("4")',
-            'p:has-text("4")',
-        ]
-        self.chat_input_selectors = [
-            'textarea[placeholder*="Type your message"]',
-            'textarea[placeholder*="message"]',
-            'input[placeholder*="Type your message"]',
-            'textarea[aria-label*="message"]',
-            '[role="textbox"]',
-            'textarea',
-            'input[type="text"]'
-        ]
-        self.send_button_selectors = [
-            # SAF-based send button selectors
-            'saf-button[aria-label*="Send"]',
-            'button[aria-label*="Send"]',
-            'saf-icon-button[aria-label*="Send"]',
-            
-            # Generic send button selectors
-            'button:has-text("Send")',
-            'button[type="submit"]',
-            '[data-testid="send-button"]',
-            'button:has([class*="send"])',
-            'button:has([class*="submit"])',
-            'button[title*="Send"]',
-            
-            # Icon-based selectors (for buttons with only icons)
-            'button:has(saf-icon[icon-name*="arrow"])',
-            'button:has(saf-icon[icon-name*="send"])',
-            'button svg[class*="send"]',
-            'button:has([class*="arrow"])',
-        ]
+        # Locators are built once per selector; they resolve lazily on every use
+        self._locators: Dict[str, Locator] = {}
+        # Locators that worked for the previous message, tried first on the next one
+        self._chat_input: Optional[Locator] = None
+        self._send_button: Optional[Locator] = None
+        # Message container selector that matched last time, counted alone next time
+        self._message_selector: Optional[str] = None
+        self.page.on("framenavigated", self._on_frame_navigated)
+        # Receives pushed response text while stream_response is running
+        self._stream_queue: Optional[asyncio.Queue] = None
+
+    async def enable_streaming(self) -> None:
+        """
+        Exposes the binding the in-page observer uses to push response text.
+        Must be called once per page before stream_response.
+        """
+        try:
+            await self.page.expose_binding(STREAM_BINDING, self._on_stream_push)
+        except Exception as e:
+            # Already registered on this page by an earlier call
+            logger.debug(f"Could not expose streaming binding: {e}")
+
+    def _on_stream_push(self, source, text: str) -> None:
+        if self._stream_queue is not None:
+            self._stream_queue.put_nowait(text)
+
+    def _on_frame_navigated(self, frame) -> None:
+        """Forget which selectors worked, as a new document may differ"""
+        if frame == self.page.main_frame:
+            self._chat_input = None
+            self._send_button = None
+            self._message_selector = None
+
+    def _locator(self, selector: str) -> Locator:
+        """Return the page locator for a selector, building it on first use"""
+        locator = self._locators.get(selector)
+        if locator is None:
+            locator = self._locators[selector] = self.page.locator(selector)
+        return locator
 
     async def detect_chat_interface(self) -> bool:
         """
@@ -78,13 +397,23 @@ class PortalInterface:
         """
         logger.info("Detecting chat interface...")
         
-        for selector in self.chat_input_selectors:
+        if self._chat_input:
             try:
-                await self.page.locator(selector).wait_for(state='visible', timeout=5000)
-                logger.info(f"Chat interface detected with selector: {selector}")
+                await self._chat_input.wait_for(state='visible', timeout=5000)
+                logger.info("Chat interface detected with cached locator")
                 return True
-            except Exception:
-                continue
+            except Exception as e:
+                logger.debug(f"Cached chat input not visible, re-resolving: {e}")
+                self._chat_input = None
+        
+        # One selector list waits for any input in a single query instead of
+        # one timeout per selector
+        try:
+            await self._locator(self.any_chat_input_selector).first.wait_for(state='visible', timeout=5000)
+            logger.info("Chat interface detected")
+            return True
+        except Exception:
+            pass
         
         logger.warning("Chat interface not detected with any selector")
         return False
@@ -99,16 +428,21 @@ class PortalInterface:
             f'div[data-model="{model_name}"]',
             f'button:has-text("{model_name}")',
             f'[aria-label*="{model_name}"]',
-            f'div:has-text("{model_name}")',
+            # Matches the innermost element with the text; div:has-text would
+            # also match, and click, every ancestor div of it
+            f'text={model_name}',
             'div[class*="model-selector"]',
             'button[class*="model"]',
             'select[name*="model"]',
         ]
         
-        for selector in model_selectors:
+        counts = await self._count_selectors(model_selectors)
+        for selector, count in zip(model_selectors, counts):
+            if count == 0:
+                continue
             try:
                 element = self.page.locator(selector)
-                if await element.count() > 0:
+                if count > 0 or await element.count() > 0:
                     await element.first.click()
                     logger.info(f"Model {model_name} selected with selector: {selector}")
                     return True
@@ -123,53 +457,125 @@ class PortalInterface:
         """
         Sends a message to the chat interface using multiple fallback selectors.
         """
-        logger.info(f"Sending message: {message[:50]}..." if len(message) > 50 else f"Sending message: {message}")
+        logger.debug(f"Sending message: {message[:50]}{'...' if len(message) > 50 else ''}")
         
-        # First, find and fill the chat input
-        chat_input = None
-        for selector in self.chat_input_selectors:
+        chat_input = await self._fill_chat_input(message)
+        
+        if await self._click_send_button():
+            return
+        
+        # Fallback: try pressing Enter
+        try:
+            await chat_input.press('Enter')
+            logger.debug("Message sent using Enter key")
+        except Exception as e:
+            raise Exception(f"Could not send message with any method: {e}")
+
+    async def _fill_chat_input(self, message: str) -> Locator:
+        """Fill the chat input, reusing the locator that worked last time"""
+        if self._chat_input:
+            try:
+                # fill() auto-waits for the input to be visible and editable
+                await self._chat_input.fill(message, timeout=10000)
+                return self._chat_input
+            except Exception as e:
+                logger.debug(f"Cached chat input failed, re-resolving: {e}")
+                self._chat_input = None
+        
+        selector = await self._first_visible(self.chat_input_selectors, timeout=10000)
+        if selector:
             try:
-                chat_input = self.page.locator(selector)
-                await chat_input.wait_for(state='visible', timeout=10000)
+                chat_input = self._locator(selector).first
                 await chat_input.fill(message)
-                logger.info(f"Message filled with selector: {selector}")
-                break
+                logger.debug(f"Message filled with selector: {selector}")
+                self._chat_input = chat_input
+                return chat_input
             except Exception as e:
                 logger.debug(f"Failed to fill message with selector {selector}: {e}")
-                continue
         
-        if not chat_input:
-            raise Exception("Could not find chat input field with any selector")
-        
-        # Wait a moment for the UI to update
-        await asyncio.sleep(0.5)
+        raise Exception("Could not find chat input field with any selector")
+    
+    async def _first_visible(self, selectors: List[str], timeout: float) -> Optional[str]:
+        """
+        Wait for all selectors at once and return the earliest in the list that is visible.
+        Once one appears, the selectors listed before it get one more visibility check,
+        since their waits may simply not have reported back yet.
+        """
+        tasks = {
+            asyncio.ensure_future(self._locator(selector).first.wait_for(state='visible', timeout=timeout)): index
+            for index, selector in enumerate(selectors)
+        }
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                visible = [tasks[task] for task in done if task.exception() is None]
+                if visible:
+                    first = min(visible)
+                    for selector in selectors[:first]:
+                        try:
+                            if await self._locator(selector).first.is_visible():
+                                return selector
+                        except Exception:
+                            continue
+                    return selectors[first]
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _click_send_button(self) -> bool:
+        """Click the send button, reusing the locator that worked last time"""
+        # One deadline for all candidates, so disabled matches cannot add up
+        deadline = asyncio.get_running_loop().time() + self.send_enable_ms / 1000
+        if self._send_button:
+            try:
+                # The wait covers the button being present, so no separate count() probe
+                if not await self._wait_until_enabled(self._send_button, deadline):
+                    raise Exception("send button stayed disabled")
+                await self._send_button.click(force=True, timeout=5000)
+                logger.debug("Send button clicked with cached locator")
+                return True
+            except Exception as e:
+                logger.debug(f"Cached send button failed, re-resolving: {e}")
+                self._send_button = None
         
-        # Find and click the send button
-        for selector in self.send_button_selectors:
+        # One page pass rules out the CSS selectors with no match; only the
+        # Playwright-only selectors still need a count() round-trip each
+        counts = await self._count_selectors(self.send_button_css_selectors)
+        present = {selector for selector, count in zip(self.send_button_css_selectors, counts) if count > 0}
+        candidates = [
+            selector for selector, count in zip(self.send_button_css_selectors, counts) if count != 0
+        ] + self.send_button_engine_selectors
+        for selector in candidates:
             try:
-                send_button = self.page.locator(selector)
-                if await send_button.count() > 0:
+                send_button = self._locator(selector)
+                if selector in present or await send_button.count() > 0:
+                    if not await self._wait_until_enabled(send_button.first, deadline):
+                        logger.debug(f"Send button stayed disabled: {selector}")
+                        continue
                     # Try multiple click methods to handle overlapping elements
                     try:
                         await send_button.first.click(force=True, timeout=5000)
-                        logger.info(f"Send button clicked with selector: {selector}")
-                        return
+                        logger.debug(f"Send button clicked with selector: {selector}")
+                        self._send_button = send_button.first
+                        return True
                     except Exception as click_error:
                         logger.debug(f"Force click failed, trying alternative methods: {click_error}")
                         
                         # Try clicking the icon directly if it's intercepting
                         try:
                             await send_button.first.click(position={"x": 12, "y": 12}, force=True)
-                            logger.info(f"Send button clicked with position offset: {selector}")
-                            return
+                            logger.debug(f"Send button clicked with position offset: {selector}")
+                            return True
                         except Exception as pos_error:
                             logger.debug(f"Position click failed: {pos_error}")
                             
                             # Try using dispatchEvent
                             try:
                                 await send_button.first.dispatch_event("click")
-                                logger.info(f"Send button clicked with dispatch event: {selector}")
-                                return
+                                logger.debug(f"Send button clicked with dispatch event: {selector}")
+                                return True
                             except Exception as dispatch_error:
                                 logger.debug(f"Dispatch event failed: {dispatch_error}")
                                 
@@ -177,88 +583,180 @@ class PortalInterface:
                 logger.debug(f"Failed to click send button with selector {selector}: {e}")
                 continue
         
-        # Fallback: try pressing Enter
+        return False
+
+    async def _wait_until_enabled(self, button: Locator, deadline: float) -> bool:
+        """
+        Wait for the UI to enable this send button after the input is filled.
+        The button is clicked with force, which skips Playwright's own actionability wait.
+        Once the shared deadline has passed, the button gets a single immediate check.
+        """
+        # A timeout of 0 would disable Playwright's timeout, so never go below 1 ms
+        timeout = max((deadline - asyncio.get_running_loop().time()) * 1000, 1)
         try:
-            await chat_input.press('Enter')
-            logger.info("Message sent using Enter key")
+            await expect(button).to_be_enabled(timeout=timeout)
+            return True
+        except AssertionError:
+            return False
+
+    async def response_count(self) -> int:
+        """Count the AI messages on the page, as a baseline taken before sending"""
+        try:
+            return await self.page.evaluate(COUNT_ELEMENTS_JS, AI_MESSAGE_SELECTOR)
         except Exception as e:
-            raise Exception(f"Could not send message with any method: {e}")
+            logger.debug(f"Error counting AI messages: {e}")
+            return 0
 
-    async def wait_for_response(self, timeout: int = 60) -> str:
+    async def wait_for_response(self, timeout: int = 60, baseline: Optional[int] = None) -> str:
         """
         Waits for and retrieves the AI's response from the chat interface.
         Uses improved detection to distinguish AI responses from user messages.
+        Pass the response_count() taken before sending; counting only now
+        can include a reply that arrived quickly and then wait for another.
         """
-        logger.info(f"Waiting for response (timeout: {timeout}s)...")
+        logger.debug(f"Waiting for response (timeout: {timeout}s)...")
         
-        # Get baseline state before waiting
-        initial_messages = await self._get_ordered_messages()
-        initial_ai_count = len([msg for msg in initial_messages if msg['type'] == 'ai'])
+        initial_ai_count = await self.response_count() if baseline is None else baseline
         logger.debug(f"Initial AI message count: {initial_ai_count}")
         
-        start_time = time.time()
-        last_check_time = start_time
-        
-        while time.time() - start_time < timeout:
+        # Wait in the page for a new AI message whose text has stopped streaming;
+        # the page resolves the promise itself, so there is no polling from here
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        stable_text = None
+        while stable_text is None:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
             try:
-                # Wait before checking again
-                await asyncio.sleep(2)
-                
-                # Check for new AI messages
-                current_messages = await self._get_ordered_messages()
-                current_ai_count = len([msg for msg in current_messages if msg['type'] == 'ai'])
-                
-                # If we have a new AI message, get it
-                if current_ai_count > initial_ai_count:
-                    logger.debug(f"New AI messages detected: {current_ai_count} vs {initial_ai_count}")
-                    
-                    response = await self._get_latest_response()
-                    if response and response.strip():
-                        logger.info(f"Response received: {response[:50]}..." if len(response) > 50 else f"Response received: {response}")
-                        return response.strip()
-                
-                # Also check for loading completion every 5 seconds
-                if time.time() - last_check_time > 5:
-                    if await self._check_loading_complete():
-                        response = await self._get_latest_response()
-                        if response and response.strip():
-                            logger.info(f"Response received after loading: {response[:50]}..." if len(response) > 50 else f"Response received: {response}")
-                            return response.strip()
-                    last_check_time = time.time()
-                
-                # Progress indicator
-                elapsed = time.time() - start_time
-                if elapsed % 10 == 0:  # Log every 10 seconds
-                    logger.debug(f"Still waiting for response... ({elapsed:.0f}s elapsed)")
-                
+                stable_text = await self.page.evaluate(WAIT_RESPONSE_STABLE_JS, {
+                    "selector": AI_MESSAGE_SELECTOR,
+                    "baseline": initial_ai_count,
+                    "stableMs": self.response_stable_ms,
+                    "timeoutMs": int(remaining * 1000),
+                })
+                break
             except Exception as e:
+                # A navigation destroys the context the wait ran in; wait again
+                # in the new document for the rest of the timeout
                 logger.debug(f"Error while waiting for response: {e}")
-                continue
+                await asyncio.sleep(0.5)
         
-        # Timeout - try to get any response that might be there
-        logger.warning(f"Timeout after {timeout}s, attempting to get any available response...")
+        if stable_text is None:
+            logger.warning(f"Timeout after {timeout}s, attempting to get any available response...")
+        else:
+            response = self._clean_ai_response_text(stable_text)
+            if response and not self._is_ui_element(response):
+                logger.info(f"Response received: {response[:50]}{'...' if len(response) > 50 else ''}")
+                return response
+            
+            # Fall back to the selector-based extraction below
+            logger.debug("Stable AI message had no usable content, using fallback extraction")
+        
+        # Try to get any response that might be there
         response = await self._get_latest_response()
         if response and response.strip():
-            logger.info(f"Found response on timeout: {response[:50]}..." if len(response) > 50 else f"Found response: {response}")
+            logger.info(f"Found response on timeout: {response[:50]}{'...' if len(response) > 50 else ''}")
             return response.strip()
         
-        raise TimeoutError(f"No AI response found within {timeout} seconds")
+        raise OperationTimeoutError(f"No AI response found within {timeout} seconds")
+
+    async def stream_response(self, message: str, timeout: int = 60) -> AsyncIterator[str]:
+        """
+        Sends a message and yields the AI's response as it streams in.
+        Each item is the text appended since the previous one. The stream ends
+        once the response has stopped changing for response_stable_ms. If the
+        portal rewrote text that was already yielded, the last item is the full
+        final response after a REVISED_MARKER line. Raises OperationTimeoutError
+        if the response has not settled when the timeout runs out.
+        """
+        baseline = await self.response_count()
+        self._stream_queue = asyncio.Queue()
+        await self.page.evaluate(STREAM_OBSERVER_JS, {
+            "selector": AI_MESSAGE_SELECTOR,
+            "baseline": baseline,
+            "binding": STREAM_BINDING,
+        })
+        
+        try:
+            await self.send_message(message)
+            
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            stable_wait = self.response_stable_ms / 1000
+            emitted = ""
+            latest = ""
+            
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    if latest:
+                        raise OperationTimeoutError(f"AI response did not settle within {timeout} seconds")
+                    break
+                try:
+                    text = await asyncio.wait_for(
+                        self._stream_queue.get(),
+                        timeout=min(remaining, stable_wait) if latest else remaining
+                    )
+                except asyncio.TimeoutError:
+                    if latest and remaining > stable_wait:
+                        break  # No change within the stability window
+                    continue
+                
+                latest = text
+                # Only emit appended text; rewrites of earlier text cannot be
+                # taken back from the terminal and are reconciled at the end
+                cleaned = self._clean_ai_response_text(text)
+                if cleaned.startswith(emitted) and len(cleaned) > len(emitted):
+                    yield cleaned[len(emitted):]
+                    emitted = cleaned
+            
+            if not latest:
+                raise OperationTimeoutError(f"No AI response found within {timeout} seconds")
+            
+            final = await self._final_response(latest)
+            if final.startswith(emitted):
+                if len(final) > len(emitted):
+                    yield final[len(emitted):]
+            else:
+                logger.debug("Streamed text was rewritten, sending the full final response")
+                yield f"{REVISED_PREFIX}{final}"
+            logger.info(f"Streamed response complete ({len(final)} chars)")
+        finally:
+            self._stream_queue = None
+            try:
+                await self.page.evaluate(STREAM_STOP_JS)
+            except Exception as e:
+                logger.debug(f"Error stopping response stream observer: {e}")
+
+    async def _final_response(self, text: str) -> str:
+        """Clean a finished message's text, falling back to selector extraction when unusable"""
+        response = self._clean_ai_response_text(text)
+        if response and not self._is_ui_element(response):
+            return response
+        logger.debug("Final AI message had no usable content, using fallback extraction")
+        fallback = await self._get_latest_response()
+        return fallback.strip() if fallback and fallback.strip() else response
 
     async def _get_message_count(self) -> int:
         """Get the current number of messages in the chat"""
         try:
-            # Try various message container selectors
-            message_selectors = [
-                '[data-testid="message"]',
-                '.message',
-                '[class*="message"]',
-                '[role="article"]',
-                'div:has-text("The capital")',
-                'div:has-text("Paris")',
-            ]
+            if self._message_selector:
+                count = await self.page.evaluate(COUNT_ELEMENTS_JS, self._message_selector)
+                if count > 0:
+                    return count
+                self._message_selector = None
             
-            for selector in message_selectors:
-                count = await self.page.locator(selector).count()
+            # Probe all selectors concurrently, then keep the first in priority order
+            selector_counts, text_counts = await asyncio.gather(
+                self._count_selectors(self.message_selectors),
+                self.page.evaluate(TEXT_MATCH_COUNTS_JS, {"tag": "div", "patterns": self.message_text_patterns}),
+            )
+            for selector, count in zip(self.message_selectors, selector_counts):
+                if count > 0:
+                    self._message_selector = selector
+                    return count
+            for count in text_counts:
                 if count > 0:
                     return count
             
@@ -266,6 +764,14 @@ class PortalInterface:
         except Exception:
             return 0
     
+    async def _count_selectors(self, selectors: List[str]) -> List[int]:
+        """Count matches for each selector in a single page evaluation; -1 means unknown"""
+        try:
+            return await self.page.evaluate(COUNT_SELECTORS_JS, selectors)
+        except Exception as e:
+            logger.debug(f"Error counting selectors: {e}")
+            return [-1] * len(selectors)
+    
     async def _get_latest_response(self) -> Optional[str]:
         """Get the latest AI response from the chat"""
         try:
@@ -279,90 +785,53 @@ class PortalInterface:
                     'saf-message-box[appearance="agent"] p',  # AI message paragraphs
                 ]
                 
-                for selector in ai_response_selectors:
-                    try:
-                        elements = self.page.locator(selector)
-                        count = await elements.count()
-                        
-                        if count > 0:
-                            # Get the last AI response (most recent)
-                            last_element = elements.nth(count - 1)
-                            text = await last_element.inner_text()
-                            
-                            # Clean up the text
-                            cleaned_text = self._clean_ai_response_text(text)
-                            
-                            if cleaned_text and len(cleaned_text.strip()) > 10 and not self._is_ui_element(cleaned_text):
-                                logger.debug(f"Found AI response with selector: {selector}")
-                                return cleaned_text
-                    except Exception as e:
-                        logger.debug(f"Error with AI response selector {selector}: {e}")
+                # Text of the last (most recent) match of every selector, in one round-trip
+                last_texts = await self.page.evaluate(LAST_TEXTS_JS, ai_response_selectors)
+                
+                for selector, text in zip(ai_response_selectors, last_texts):
+                    if text is None:
                         continue
+                    
+                    # Clean up the text
+                    cleaned_text = self._clean_ai_response_text(text)
+                    
+                    if cleaned_text and len(cleaned_text.strip()) > 10 and not self._is_ui_element(cleaned_text):
+                        logger.debug(f"Found AI response with selector: {selector}")
+                        return cleaned_text
                 
             except Exception as e:
                 logger.debug(f"Error in direct selector response detection: {e}")
             
-            # Strategy 2: Look for saf-message-box elements
+            # Strategy 2: Look for substantial content inside the last AI message box
             try:
-                # Get AI message boxes
-                ai_message_boxes = self.page.locator('saf-message-box[appearance="agent"]')
-                count = await ai_message_boxes.count()
+                # Look for the actual content within the message box
+                content_selectors = [
+                    '[data-testid="remark-wrapper"]',
+                    'p',
+                    'div:not([class*="metadata"]):not([class*="avatar"])',
+                ]
                 
-                if count > 0:
-                    # Get the last AI message box
-                    last_ai_box = ai_message_boxes.nth(count - 1)
-                    
-                    # Try to get the content from within the message box
-                    try:
-                        # Look for the actual content within the message box
-                        content_selectors = [
-                            '[data-testid="remark-wrapper"]',
-                            'p',
-                            'div:not([class*="metadata"]):not([class*="avatar"])',
-                        ]
-                        
-                        for content_selector in content_selectors:
-                            try:
-                                content_elements = last_ai_box.locator(content_selector)
-                                content_count = await content_elements.count()
-                                
-                                if content_count > 0:
-                                    # Get the first substantial content element
-                                    for i in range(content_count):
-                                        content_element = content_elements.nth(i)
-                                        text = await content_element.inner_text()
-                                        
-                                        if text and len(text.strip()) > 10 and not self._is_ui_element(text):
-                                            cleaned_text = self._clean_ai_response_text(text)
-                                            if cleaned_text and len(cleaned_text.strip()) > 10:
-                                                logger.debug(f"Found AI response in message box: {cleaned_text[:50]}...")
-                                                return cleaned_text
-                            except Exception as e:
-                                logger.debug(f"Error with content selector {content_selector}: {e}")
-                                continue
-                                
-                    except Exception as e:
-                        logger.debug(f"Error extracting content from message box: {e}")
-                        
-                        # Fallback: get all text from the message box
-                        try:
-                            full_text = await last_ai_box.inner_text()
-                            if full_text and len(full_text.strip()) > 10:
-                                cleaned_text = self._clean_ai_response_text(full_text)
-                                if cleaned_text and len(cleaned_text.strip()) > 10:
-                                    logger.debug(f"Found AI response from full message box: {cleaned_text[:50]}...")
-                                    return cleaned_text
-                        except Exception as e:
-                            logger.debug(f"Error getting full text from message box: {e}")
+                candidates = await self.page.evaluate(SUBSTANTIAL_TEXTS_JS, {
+                    "selector": AI_MESSAGE_SELECTOR,
+                    "contentSelectors": content_selectors,
+                    "minLength": 10,
+                    "limit": 50,
+                })
+                
+                for texts in candidates:
+                    for text in texts:
+                        if not self._is_ui_element(text):
+                            cleaned_text = self._clean_ai_response_text(text)
+                            if cleaned_text and len(cleaned_text.strip()) > 10:
+                                logger.debug(f"Found AI response in message box: {cleaned_text[:50]}...")
+                                return cleaned_text
                 
             except Exception as e:
                 logger.debug(f"Error in message box response detection: {e}")
             
-            # Strategy 3: Fallback - look for response patterns in page content
+            # Strategy 3: Fallback - look for response patterns in page content.
+            # Matching runs in the page so only the matched sentence is transferred.
             try:
-                # Get all text content and look for response patterns
-                page_content = await self.page.inner_text('body')
-                
                 # Look for common AI response patterns
                 response_patterns = [
                     'The capital of Germany is',
@@ -378,15 +847,12 @@ class PortalInterface:
                     'Let me',
                 ]
                 
-                for pattern in response_patterns:
-                    if pattern.lower() in page_content.lower():
-                        # Extract the sentence containing the pattern
-                        sentences = page_content.split('.')
-                        for sentence in sentences:
-                            if pattern.lower() in sentence.lower():
-                                # Make sure it's not a user question
-                                if not ('?' in sentence or sentence.strip().startswith('What') or sentence.strip().startswith('How')):
-                                    return sentence.strip() + '.'
+                sentence = await self.page.evaluate(FIND_RESPONSE_SENTENCE_JS, {
+                    "patterns": response_patterns,
+                    "selector": AI_MESSAGE_SELECTOR,
+                })
+                if sentence:
+                    return sentence
                 
             except Exception as e:
                 logger.debug(f"Error in fallback response detection: {e}")
@@ -417,11 +883,11 @@ class PortalInterface:
                 continue
                 
             # Skip cost information lines
-            if 'query cost' in line.lower() or 'usd' in line.lower() or '$' in line:
+            if COST_LINE_RE.search(line):
                 continue
                 
             # Skip model name lines
-            if 'claude' in line.lower() and 'sonnet' in line.lower():
+            if MODEL_LINE_RE.search(line):
                 continue
                 
             # Skip user initials (AP, etc.)
@@ -550,77 +1016,26 @@ class PortalInterface:
         try:
             # Strategy 1: Look for saf-message-box elements (most reliable)
             try:
-                # Get user message boxes
-                user_message_boxes = self.page.locator('saf-message-box[appearance="user"]')
-                user_count = await user_message_boxes.count()
-                
-                for i in range(user_count):
-                    try:
-                        element = user_message_boxes.nth(i)
-                        text = await element.inner_text()
-                        
-                        if text and len(text.strip()) > 5:
-                            # Get position for ordering
-                            try:
-                                position = await element.bounding_box()
-                                y_pos = position['y'] if position else 0
-                            except:
-                                y_pos = 0
-                            
-                            # Check for timestamp indicators
-                            timestamp_score = 0
-                            if 'just now' in text:
-                                timestamp_score = 1000  # Most recent
-                            elif 'ago' in text:
-                                timestamp_score = 500  # Older
-                            
-                            messages.append({
-                                'text': text,
-                                'type': 'user',
-                                'position': y_pos,
-                                'selector': 'saf-message-box[appearance="user"]',
-                                'timestamp_score': timestamp_score
-                            })
-                            
-                    except Exception as e:
-                        logger.debug(f"Error getting user message {i}: {e}")
-                        continue
-                
-                # Get AI message boxes
-                ai_message_boxes = self.page.locator('saf-message-box[appearance="agent"]')
-                ai_count = await ai_message_boxes.count()
+                user_selector = 'saf-message-box[appearance="user"]'
+                ai_selector = 'saf-message-box[appearance="agent"]'
+                user_elements, ai_elements = await self.page.evaluate(
+                    COLLECT_ELEMENTS_JS, [user_selector, ai_selector]
+                )
                 
-                for i in range(ai_count):
-                    try:
-                        element = ai_message_boxes.nth(i)
-                        text = await element.inner_text()
-                        
+                for msg_type, selector, elements in (
+                    ('user', user_selector, user_elements),
+                    ('ai', ai_selector, ai_elements),
+                ):
+                    for element in elements:
+                        text = element['text']
                         if text and len(text.strip()) > 5:
-                            # Get position for ordering
-                            try:
-                                position = await element.bounding_box()
-                                y_pos = position['y'] if position else 0
-                            except:
-                                y_pos = 0
-                            
-                            # Check for timestamp indicators
-                            timestamp_score = 0
-                            if 'just now' in text:
-                                timestamp_score = 1000  # Most recent
-                            elif 'ago' in text:
-                                timestamp_score = 500  # Older
-                            
                             messages.append({
                                 'text': text,
-                                'type': 'ai',
-                                'position': y_pos,
-                                'selector': 'saf-message-box[appearance="agent"]',
-                                'timestamp_score': timestamp_score
+                                'type': msg_type,
+                                'position': element['position'],
+                                'selector': selector,
+                                'timestamp_score': self._timestamp_score(text)
                             })
-                            
-                    except Exception as e:
-                        logger.debug(f"Error getting AI message {i}: {e}")
-                        continue
                         
             except Exception as e:
                 logger.debug(f"Error getting saf-message-box elements: {e}")
@@ -633,14 +1048,12 @@ class PortalInterface:
                     '._copyButton_1owfm_31',  # AI response with copy button
                 ]
                 
-                for selector in fallback_selectors:
-                    try:
-                        elements = self.page.locator(selector)
-                        count = await elements.count()
-                        
-                        for i in range(count):
-                            element = elements.nth(i)
-                            text = await element.inner_text()
+                try:
+                    batches = await self.page.evaluate(COLLECT_ELEMENTS_JS, fallback_selectors)
+                    
+                    for selector, elements in zip(fallback_selectors, batches):
+                        for element in elements:
+                            text = element['text']
                             
                             if text and len(text.strip()) > 10:  # Only substantial content
                                 # Determine message type
@@ -650,24 +1063,16 @@ class PortalInterface:
                                 elif selector in ['[data-testid="remark-wrapper"]', '._copyButton_1owfm_31'] or self._is_likely_ai_response(text):
                                     msg_type = 'ai'
                                 
-                                # Get position for ordering
-                                try:
-                                    position = await element.bounding_box()
-                                    y_pos = position['y'] if position else 0
-                                except:
-                                    y_pos = 0
-                                
                                 messages.append({
                                     'text': text,
                                     'type': msg_type,
-                                    'position': y_pos,
+                                    'position': element['position'],
                                     'selector': selector,
                                     'timestamp_score': 0
                                 })
                                 
-                    except Exception as e:
-                        logger.debug(f"Error getting messages with selector {selector}: {e}")
-                        continue
+                except Exception as e:
+                    logger.debug(f"Error getting fallback messages: {e}")
             
             # Sort by position (top to bottom) and then by timestamp score (most recent first)
             messages.sort(key=lambda x: (x['position'], -x.get('timestamp_score', 0)))
@@ -688,22 +1093,18 @@ class PortalInterface:
             logger.debug(f"Error getting ordered messages: {e}")
             return []
     
+    def _timestamp_score(self, text: str) -> int:
+        """Rank message recency from its relative timestamp text"""
+        if 'just now' in text:
+            return 1000  # Most recent
+        if 'ago' in text:
+            return 500  # Older
+        return 0
+    
     async def _check_loading_complete(self) -> bool:
         """Check if loading indicators are gone"""
         try:
-            loading_selectors = [
-                '[data-testid="loading"]',
-                '.loading',
-                '[class*="loading"]',
-                '[class*="spinner"]',
-                '[aria-label*="loading"]',
-            ]
-            
-            for selector in loading_selectors:
-                if await self.page.locator(selector).count() > 0:
-                    return False
-            
-            return True
+            return await self.page.evaluate(COUNT_ELEMENTS_JS, LOADING_SELECTOR) == 0
         except Exception:
             return True
     
@@ -722,12 +1123,22 @@ class PortalInterface:
     async def get_page_info(self) -> Dict[str, Any]:
         """Get information about the current page for debugging"""
         try:
+            # Everything but the title comes from one snapshot of the page
+            title, state = await asyncio.gather(
+                self.page.title(),
+                self.page.evaluate(PAGE_STATE_JS, {
+                    "chatInputSelectors": self.chat_input_selectors,
+                    "messageSelectors": self.message_selectors,
+                    "textPatterns": self.message_text_patterns,
+                    "loadingSelector": LOADING_SELECTOR,
+                }),
+            )
             return {
                 "url": self.page.url,
-                "title": await self.page.title(),
-                "chat_interface_detected": await self.detect_chat_interface(),
-                "message_count": await self._get_message_count(),
-                "loading_complete": await self._check_loading_complete(),
+                "title": title,
+                "chat_interface_detected": state["chatInterfaceDetected"],
+                "message_count": next((count for count in state["messageCounts"] if count > 0), 0),
+                "loading_complete": state["loadingComplete"],
             }
         except Exception as e:
             logger.error(f"Error getting page info: {e}")
@@ -2,6 +2,7 @@ import pytest
 import asyncio
 import sys
 import os
+from unittest.mock import AsyncMock, Mock
 from playwright.async_api import async_playwright
 from pytest_asyncio import fixture as async_fixture
 
@@ -10,8 +11,9 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
+from mcp_server import browser_agent as browser_agent_module
 from mcp_server.browser_agent import BrowserAgent
-from src.portal.portal_interface import PortalInterface
+from src.portal.portal_interface import REVISED_PREFIX, PortalInterface
 
 @async_fixture(scope="function")
 async def browser_agent_instance():
@@ -36,4 +38,162 @@ async def test_login_and_chat_interface(browser_agent_instance):
     chat_detected = await portal_interface.detect_chat_interface()
     assert chat_detected is True, "Chat interface should be detected after navigation and login."
 
-    print(f"Chat interface detected: {chat_detected}")
\ No newline at end of file
+    print(f"Chat interface detected: {chat_detected}")
+
+@pytest.mark.asyncio
+async def test_ask_ai_many_keeps_order_and_errors():
+    """ask_ai_many returns results in query order, with failures in place."""
+    agent = BrowserAgent()
+
+    async def fake_ask(query):
+        if query == "bad":
+            raise ValueError("Query cannot be empty")
+        await asyncio.sleep(0.01 if query == "first" else 0)
+        return query.upper()
+
+    agent.ask_ai = AsyncMock(side_effect=fake_ask)
+    results = await agent.ask_ai_many(["first", "bad", "second"], concurrency=2)
+
+    assert results[0] == "FIRST"
+    assert isinstance(results[1], ValueError)
+    assert results[2] == "SECOND"
+
+
+@pytest.mark.asyncio
+async def test_stream_budget_restarts_for_revised_response(monkeypatch):
+    """A revised final response is not counted against the text it replaces."""
+    agent = BrowserAgent()
+    agent.page = Mock()
+    agent._check_connection_health = AsyncMock()
+    monkeypatch.setattr(agent.config.security, "max_response_length", 10)
+
+    async def fake_stream(query, timeout):
+        yield "Paris is"
+        yield f"{REVISED_PREFIX}It is Paris"
+
+    portal_interface = Mock(stream_response=fake_stream)
+    agent.acquire = AsyncMock(return_value=portal_interface)
+    agent.release = Mock()
+
+    chunks = [chunk async for chunk in agent.ask_ai_stream("Capital of France?")]
+
+    assert chunks == ["Paris is", f"{REVISED_PREFIX}It is Pari...[truncated]"]
+
+
+@pytest.mark.asyncio
+async def test_page_pool_checks_tabs_out_and_back_in():
+    """A single-tab pool hands out the main tab and blocks until it is released."""
+    agent = BrowserAgent()
+    agent.portal_interface = object()
+    await agent._warm_up_pool(1)
+
+    portal_interface = await agent.acquire()
+    assert portal_interface is agent.portal_interface
+
+    waiter = asyncio.create_task(agent.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    agent.release(portal_interface)
+    assert await waiter is portal_interface
+
+
+@pytest.mark.asyncio
+async def test_failed_health_check_reconnects_without_raising():
+    """A failed probe re-attaches over CDP instead of surfacing the error."""
+    agent = BrowserAgent()
+    agent.page = AsyncMock()
+    agent.page.title.side_effect = Exception("Target closed")
+    agent._playwright = object()
+    agent.connect_to_browser = AsyncMock()
+
+    await agent._check_connection_health()
+
+    agent.connect_to_browser.assert_awaited_once_with(agent._playwright, max_retries=1)
+
+
+@pytest.mark.asyncio
+async def test_portal_status_probes_page_after_reconnect():
+    """Status probes read the page the health check reconnected to, not the stale one."""
+    agent = BrowserAgent()
+    agent.page = AsyncMock()
+    agent.page.url = "https://login.example.com/signin"
+    agent.page.title.side_effect = Exception("Target closed")
+    agent._playwright = object()
+    fresh_page = Mock(url="https://example.com/ai-platform")
+
+    async def reconnect(playwright, max_retries):
+        await asyncio.sleep(0)  # Re-attaching takes at least one round-trip
+        agent.page = fresh_page
+
+    agent.connect_to_browser = AsyncMock(side_effect=reconnect)
+
+    status = await agent.check_portal_status()
+
+    assert status["authenticated"] is True
+    assert status["portal_url"] == fresh_page.url
+
+
+@pytest.mark.asyncio
+async def test_portal_session_reuses_title_within_ttl():
+    """Repeated session polls read the page title once per TTL window."""
+    agent = BrowserAgent()
+    agent.page = AsyncMock()
+    agent.page.url = "https://example.com/ai-platform"
+    agent.page.title.return_value = "AI Platform"
+    agent.page.evaluate.return_value = "Mozilla/5.0"
+
+    first = await agent.get_portal_session()
+    second = await agent.get_portal_session()
+
+    assert first == second
+    assert second["page_title"] == "AI Platform"
+    agent.page.title.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_open_portal_tolerates_login_redirect(monkeypatch):
+    """A login page without a chat input still yields an interface instead of failing the connection."""
+    agent = BrowserAgent()
+    page = AsyncMock()
+    page.url = "https://login.example.com/signin"
+    page.on = Mock()
+    chat_input = Mock()
+    chat_input.is_visible = AsyncMock(return_value=False)
+    page.locator = Mock(return_value=Mock(first=chat_input))
+
+    assertion = Mock()
+    assertion.to_be_visible = AsyncMock(side_effect=AssertionError("not visible"))
+    monkeypatch.setattr(browser_agent_module, "expect", Mock(return_value=assertion))
+
+    portal_interface = await agent._open_portal(page)
+
+    assert portal_interface.page is page
+    page.goto.assert_awaited_once()
+    agent.page = page
+    assert await agent._check_authentication() is False
+
+
+@pytest.mark.asyncio
+async def test_mixed_case_login_redirect_is_not_authenticated():
+    """SSO redirects such as /SignIn or ?ReturnUrl=/Login count as logged out."""
+    agent = BrowserAgent()
+    agent.page = Mock()
+    for url in ("https://sso.example.com/adfs/ls/SignIn", "https://example.com/Account?ReturnUrl=/Login"):
+        agent.page.url = url
+        assert await agent._check_authentication() is False
+
+
+@pytest.mark.asyncio
+async def test_close_is_idempotent():
+    """A second close() does not close the browser or stop Playwright again."""
+    agent = BrowserAgent()
+    browser = AsyncMock()
+    playwright_instance = AsyncMock()
+    agent.browser = browser
+    agent.playwright_instance = playwright_instance
+
+    await asyncio.gather(agent.close(), agent.close())
+
+    browser.close.assert_awaited_once()
+    playwright_instance.stop.assert_awaited_once()
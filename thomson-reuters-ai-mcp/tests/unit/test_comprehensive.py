@@ -98,7 +98,7 @@ def test_exceptions(results: TestResultsHelper):
     try:
         from mcp_server.exceptions import (
             BrowserConnectionError, PortalError, AuthenticationError,
-            TimeoutError, ValidationError, ConfigurationError
+            OperationTimeoutError, ValidationError, ConfigurationError
         )
         
         # Test exception creation and inheritance
@@ -0,0 +1,117 @@
+import pytest
+import asyncio
+import json
+import sys
+import os
+from unittest.mock import AsyncMock, Mock
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from mcp_server.daemon import AgentDaemon, _rebuild_error
+from mcp_server.exceptions import MCPAgentError, PortalError
+
+
+def make_daemon():
+    """Daemon with a mocked, already-connected browser agent."""
+    daemon = AgentDaemon()
+    daemon.browser_agent = Mock()
+    daemon.browser_agent.page = Mock(url="https://example.com/ai-platform")
+    daemon.browser_agent.ask_ai = AsyncMock(return_value="Paris")
+    daemon.browser_agent.list_available_models = AsyncMock(return_value=["Claude Sonnet 4"])
+    return daemon
+
+
+@pytest.mark.asyncio
+async def test_dispatch_ask_returns_result():
+    daemon = make_daemon()
+    response = await daemon._dispatch(json.dumps({"command": "ask", "query": "Capital of France?"}).encode(), AsyncMock())
+    assert response == {"ok": True, "result": "Paris"}
+    daemon.browser_agent.ask_ai.assert_awaited_once_with("Capital of France?")
+
+
+@pytest.mark.asyncio
+async def test_dispatch_unknown_command():
+    daemon = make_daemon()
+    response = await daemon._dispatch(b'{"command": "bogus"}', AsyncMock())
+    assert response["ok"] is False
+    assert "bogus" in response["error"]
+
+
+@pytest.mark.asyncio
+async def test_dispatch_reports_error_type():
+    daemon = make_daemon()
+    daemon.browser_agent.ask_ai = AsyncMock(side_effect=PortalError("portal down"))
+    response = await daemon._dispatch(b'{"command": "ask", "query": "hi"}', AsyncMock())
+    assert response == {"ok": False, "error_type": "PortalError", "error": "portal down"}
+
+
+@pytest.mark.asyncio
+async def test_dispatch_ask_stream_emits_chunks():
+    daemon = make_daemon()
+
+    async def fake_stream(query):
+        for chunk in ("Par", "is"):
+            yield chunk
+
+    daemon.browser_agent.ask_ai_stream = fake_stream
+    emit = AsyncMock()
+    response = await daemon._dispatch(b'{"command": "ask_stream", "query": "hi"}', emit)
+    assert response == {"ok": True, "result": "Paris"}
+    assert [call.args[0] for call in emit.await_args_list] == ["Par", "is"]
+
+
+def test_rebuild_error_maps_exception_classes():
+    assert isinstance(_rebuild_error("PortalError", "x"), PortalError)
+    assert isinstance(_rebuild_error("ValueError", "x"), ValueError)
+    assert type(_rebuild_error("KeyError", "x")) is MCPAgentError
+
+
+@pytest.mark.asyncio
+async def test_dispatch_rejects_missing_or_wrong_token():
+    daemon = make_daemon()
+    daemon._token = "secret"
+    for token in (None, "guess"):
+        response = await daemon._dispatch(json.dumps({"command": "ask", "query": "hi", "token": token}).encode(), AsyncMock())
+        assert response["ok"] is False
+    daemon.browser_agent.ask_ai.assert_not_awaited()
+
+    response = await daemon._dispatch(json.dumps({"command": "ask", "query": "hi", "token": "secret"}).encode(), AsyncMock())
+    assert response == {"ok": True, "result": "Paris"}
+
+
+@pytest.mark.asyncio
+async def test_stop_leaves_socket_bound_by_another_daemon(tmp_path, monkeypatch):
+    daemon = make_daemon()
+    daemon.browser_agent.close = AsyncMock()
+    socket_path = tmp_path / "agent.sock"
+    socket_path.write_text("")
+    monkeypatch.setattr(daemon.config.daemon, "socket_path", str(socket_path))
+    daemon._socket_inode = socket_path.stat().st_ino + 1
+    await daemon.stop()
+    assert socket_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_dispatch_runs_asks_concurrently():
+    daemon = make_daemon()
+    daemon._ensure_connected = AsyncMock()
+    running = 0
+    peak = 0
+
+    async def fake_ask(query):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return query
+
+    daemon.browser_agent.ask_ai = fake_ask
+    responses = await asyncio.gather(*(
+        daemon._dispatch(json.dumps({"command": "ask", "query": q}).encode(), AsyncMock()) for q in ("a", "b")
+    ))
+    assert [r["result"] for r in responses] == ["a", "b"]
+    assert peak == 2
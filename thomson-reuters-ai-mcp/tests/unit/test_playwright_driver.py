@@ -0,0 +1,45 @@
+import pytest
+import asyncio
+import sys
+import os
+from unittest.mock import AsyncMock, Mock
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from mcp_server import playwright_driver
+
+
+@pytest.fixture
+def fake_playwright(monkeypatch):
+    """Patch async_playwright so starting it returns a mock instance."""
+    instance = Mock(stop=AsyncMock())
+    starter = Mock(start=AsyncMock(return_value=instance))
+    factory = Mock(return_value=starter)
+    monkeypatch.setattr(playwright_driver, "async_playwright", factory)
+    monkeypatch.setattr(playwright_driver, "_instance", None)
+    monkeypatch.setattr(playwright_driver, "_instance_loop", None)
+    monkeypatch.setattr(playwright_driver, "_lock", None)
+    return instance, starter
+
+
+@pytest.mark.asyncio
+async def test_get_playwright_starts_driver_once(fake_playwright):
+    instance, starter = fake_playwright
+    results = await asyncio.gather(*(playwright_driver.get_playwright() for _ in range(3)))
+    assert results == [instance] * 3
+    starter.start.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_stop_playwright_allows_restart(fake_playwright):
+    instance, starter = fake_playwright
+    await playwright_driver.get_playwright()
+    await playwright_driver.stop_playwright()
+    await playwright_driver.stop_playwright()
+    instance.stop.assert_awaited_once()
+
+    await playwright_driver.get_playwright()
+    assert starter.start.await_count == 2
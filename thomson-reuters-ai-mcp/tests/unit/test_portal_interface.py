@@ -0,0 +1,107 @@
+import pytest
+import asyncio
+import sys
+import os
+from unittest.mock import AsyncMock, Mock
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from mcp_server.exceptions import OperationTimeoutError
+from src.portal import portal_interface as portal_interface_module
+from src.portal.portal_interface import REVISED_MARKER, WAIT_RESPONSE_STABLE_JS, PortalInterface
+
+
+def make_streaming_interface(*pushes):
+    """Interface whose send_message pushes the given texts as the page observer would."""
+    page = Mock()
+    page.evaluate = AsyncMock(return_value=0)
+    interface = PortalInterface(page)
+    interface.response_stable_ms = 20
+
+    async def fake_send(message):
+        for text in pushes:
+            interface._on_stream_push(None, text)
+
+    interface.send_message = fake_send
+    return interface
+
+
+@pytest.mark.asyncio
+async def test_stream_response_yields_appended_text():
+    interface = make_streaming_interface("The capital", "The capital of France is Paris.")
+    chunks = [chunk async for chunk in interface.stream_response("Capital of France?", timeout=5)]
+    assert chunks == ["The capital", " of France is Paris."]
+
+
+@pytest.mark.asyncio
+async def test_stream_response_sends_final_text_after_prefix_rewrite():
+    interface = make_streaming_interface(
+        "Thinking... The capital",
+        "The capital of France",
+        "The capital of France is Paris.",
+    )
+    chunks = [chunk async for chunk in interface.stream_response("Capital of France?", timeout=5)]
+    assert chunks[0] == "Thinking... The capital"
+    assert chunks[-1] == f"\n{REVISED_MARKER}\nThe capital of France is Paris."
+
+
+@pytest.mark.asyncio
+async def test_wait_for_response_waits_again_after_navigation():
+    page = Mock()
+    waits = [Exception("Execution context was destroyed"), "The capital of France is Paris."]
+
+    async def fake_evaluate(script, arg=None):
+        if script == WAIT_RESPONSE_STABLE_JS:
+            result = waits.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        raise Exception("Execution context was destroyed")
+
+    page.evaluate = fake_evaluate
+    interface = PortalInterface(page)
+    response = await interface.wait_for_response(timeout=5)
+    assert response == "The capital of France is Paris."
+
+
+@pytest.mark.asyncio
+async def test_wait_for_response_times_out_when_page_keeps_failing():
+    page = Mock()
+    page.evaluate = AsyncMock(side_effect=Exception("Target closed"))
+    interface = PortalInterface(page)
+    with pytest.raises(OperationTimeoutError):
+        await interface.wait_for_response(timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_stream_response_raises_when_still_streaming_at_timeout():
+    interface = make_streaming_interface("The capital")
+    interface.response_stable_ms = 5000
+    chunks = []
+    with pytest.raises(OperationTimeoutError):
+        async for chunk in interface.stream_response("Capital of France?", timeout=0.2):
+            chunks.append(chunk)
+    assert chunks == ["The capital"]
+
+
+@pytest.mark.asyncio
+async def test_disabled_send_buttons_share_one_enable_deadline(monkeypatch):
+    page = Mock()
+    page.evaluate = AsyncMock(side_effect=lambda script, selectors: [1] * len(selectors))
+    page.locator = Mock(return_value=Mock(first=Mock(), count=AsyncMock(return_value=0)))
+    interface = PortalInterface(page)
+    timeouts = []
+
+    async def stays_disabled(timeout):
+        timeouts.append(timeout)
+        await asyncio.sleep(timeout / 1000)
+        raise AssertionError("disabled")
+
+    monkeypatch.setattr(portal_interface_module, "expect", Mock(return_value=Mock(to_be_enabled=stays_disabled)))
+
+    assert await interface._click_send_button() is False
+    assert len(timeouts) == len(interface.send_button_css_selectors)
+    assert sum(timeouts) < interface.send_enable_ms + 100
@@ -0,0 +1,30 @@
+import sys
+import os
+from unittest.mock import Mock
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from mcp_server.portal_session import find_portal_page
+
+
+def make_browser(*context_urls):
+    """Mock browser whose contexts hold pages with the given URLs."""
+    browser = Mock()
+    browser.contexts = [
+        Mock(pages=[Mock(url=url) for url in urls]) for urls in context_urls
+    ]
+    return browser
+
+
+def test_find_portal_page_prefers_open_portal_tab():
+    portal_url = "https://dataandanalytics.int.thomsonreuters.com/ai-platform/ai-experiences/use/abc"
+    browser = make_browser(["https://example.com"], ["about:blank", portal_url])
+    assert find_portal_page(browser).url == portal_url
+
+
+def test_find_portal_page_returns_none_without_portal_tab():
+    browser = make_browser(["https://example.com", "about:blank"])
+    assert find_portal_page(browser) is None